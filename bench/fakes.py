@@ -0,0 +1,207 @@
+"""In-process stand-ins for the parts of discord.py the bot uses
+
+Every call that would hit the Discord API goes through FakeAPI, which counts it, sleeps for
+the configured latency and fails a configurable fraction of calls with a 429 so the bot's
+retry paths are exercised too.
+"""
+import asyncio
+import random
+from types import SimpleNamespace
+
+import discord
+
+class FakeAPI:
+    """Simulated Discord HTTP layer - latency, 429s and per-endpoint call counts"""
+
+    def __init__(self, latency_ms=0, rate_limit_ratio=0.0, seed=0):
+        self.latency = latency_ms / 1000
+        self.rate_limit_ratio = rate_limit_ratio
+        self.random = random.Random(seed)
+        self.calls = {}  # {endpoint: count}
+        self.rate_limited = 0
+
+    async def call(self, endpoint):
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rate_limit_ratio and self.random.random() < self.rate_limit_ratio:
+            self.rate_limited += 1
+            raise discord.HTTPException(SimpleNamespace(status=429, reason='Too Many Requests'), 'You are being rate limited.')
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+class FakeMember:
+    __slots__ = ('api', 'id', 'name', 'bot', 'guild', 'roles', 'premium_since')
+
+    def __init__(self, api, member_id, guild, bot=False):
+        self.api = api
+        self.id = member_id
+        self.name = f'member{member_id}'
+        self.bot = bot
+        self.guild = guild
+        self.roles = []
+        self.premium_since = None
+
+    @property
+    def mention(self):
+        return f'<@{self.id}>'
+
+    async def kick(self, reason=None):
+        await self.api.call('kick')
+        self.guild.remove_member(self.id)
+
+    async def add_roles(self, *roles, reason=None):
+        await self.api.call('add_roles')
+        self.roles.extend(roles)
+
+class FakeReaction:
+    def __init__(self, emoji):
+        self.emoji = emoji
+
+class FakeMessage:
+    __slots__ = ('api', 'id', 'author', 'channel', 'guild', 'content', 'reactions')
+
+    def __init__(self, api, message_id, author, channel, content='Hi, I am new here!', reactions=()):
+        self.api = api
+        self.id = message_id
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.reactions = list(reactions)
+
+    async def add_reaction(self, emoji):
+        await self.api.call('add_reaction')
+
+    async def delete(self):
+        await self.api.call('delete_message')
+
+class FakePartialMessage:
+    def __init__(self, api, message_id):
+        self.api = api
+        self.id = message_id
+
+    async def add_reaction(self, emoji):
+        await self.api.call('add_reaction')
+
+class FakeChannel:
+    """Text channel with an in-memory history, served in pages of 100 like the real API"""
+
+    def __init__(self, api, channel_id, guild):
+        self.api = api
+        self.id = channel_id
+        self.guild = guild
+        self.name = f'channel{channel_id}'
+        self.messages = []  # Oldest first
+
+    @property
+    def mention(self):
+        return f'<#{self.id}>'
+
+    async def send(self, content=None, embed=None, embeds=None):
+        await self.api.call('send_message')
+
+    def get_partial_message(self, message_id):
+        return FakePartialMessage(self.api, message_id)
+
+    async def history(self, limit=100, after=None, before=None, oldest_first=None):
+        messages = self.messages
+        if after is not None:
+            messages = [message for message in messages if message.id > after.id]
+        if before is not None:
+            messages = [message for message in messages if message.id < before.id]
+        if oldest_first is None:
+            oldest_first = after is not None
+        if not oldest_first:
+            messages = messages[::-1]
+        if limit is not None:
+            messages = messages[:limit]
+        for i, message in enumerate(messages):
+            if i % 100 == 0:
+                await self.api.call('history_page')
+            yield message
+
+class FakeDMChannel:
+    def __init__(self, api):
+        self.api = api
+
+    async def send(self, content=None, embed=None):
+        await self.api.call('send_dm')
+
+class FakeGuild:
+    chunked = True  # Every member is in member_map, like a fully chunked guild
+
+    def __init__(self, api, guild_id, member_count, first_member_id=10**17):
+        self.api = api
+        self.id = guild_id
+        self.name = f'guild{guild_id}'
+        self.channels = {}
+        self.member_map = {
+            member_id: FakeMember(api, member_id, self)
+            for member_id in range(first_member_id, first_member_id + member_count)
+        }
+
+    @property
+    def member_count(self):
+        return len(self.member_map)
+
+    @property
+    def members(self):
+        return list(self.member_map.values())
+
+    def get_member(self, member_id):
+        return self.member_map.get(member_id)
+
+    def add_member(self, member_id):
+        member = self.member_map[member_id] = FakeMember(self.api, member_id, self)
+        return member
+
+    def remove_member(self, member_id):
+        self.member_map.pop(member_id, None)
+
+    async def query_members(self, user_ids, limit=5, cache=True):
+        await self.api.call('query_members')
+        return [self.member_map[user_id] for user_id in user_ids if user_id in self.member_map]
+
+    async def chunk(self):
+        await self.api.call('chunk')
+
+    def get_role(self, role_id):
+        return FakeRole(role_id)
+
+    def add_channel(self, channel_id):
+        channel = self.channels[channel_id] = FakeChannel(self.api, channel_id, self)
+        return channel
+
+class FakeContext:
+    """Command context - only what the admin commands touch"""
+
+    def __init__(self, guild):
+        self.guild = guild
+        self.sent = []
+
+    async def send(self, content=None, embed=None):
+        await self.guild.api.call('send_message')
+        self.sent.append(content if embed is None else embed)
+
+def install(bot, api, guilds):
+    """Point the bot's Discord lookups and API calls at the fakes"""
+    channels = {channel.id: channel for guild in guilds for channel in guild.channels.values()}
+    guilds_by_id = {guild.id: guild for guild in guilds}
+
+    async def create_dm(user):
+        await api.call('create_dm')
+        return FakeDMChannel(api)
+
+    async def process_commands(message):
+        pass
+
+    bot.get_channel = channels.get
+    bot.get_guild = guilds_by_id.get
+    bot.create_dm = create_dm
+    bot.process_commands = process_commands
@@ -0,0 +1,323 @@
+"""Offline benchmarks for the bot's hot paths, run against the fakes in bench/fakes.py
+
+Each scenario runs in its own subprocess (fresh bot state, clean memory numbers) in a
+temporary directory, and reports wall time, Discord API calls, peak RSS and how long the
+event loop was blocked. Results are saved under bench/results/ so runs can be compared:
+
+    python bench/run_benchmarks.py                       # default sizes, saved as <git rev>.json
+    python bench/run_benchmarks.py --full                # add the 500k-member guilds
+    python bench/run_benchmarks.py --only join_burst --latency-ms 50 --rate-limit 0.02
+    python bench/run_benchmarks.py --compare bench/results/abc1234.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+GUILD_ID = 1
+INTRO_CHANNEL_ID = 2
+MOD_LOG_CHANNEL_ID = 3
+GENERAL_CHANNEL_ID = 4
+
+# {scenario: [params, ...]} - sizes marked 'full' only run with --full
+SCENARIOS = {
+    'on_message': [{'members': 1_000}, {'members': 10_000}, {'members': 100_000}, {'members': 500_000, 'full': True}],
+    'check_reminders': [{'pending': 100}, {'pending': 1_000}, {'pending': 10_000}, {'pending': 100_000, 'full': True}],
+    'check_kicks': [{'pending': 100}, {'pending': 1_000}, {'pending': 10_000}, {'pending': 100_000, 'full': True}],
+    'scan_history': [{'messages': 1_000}, {'messages': 10_000}],
+    'track_existing': [{'members': 1_000}, {'members': 10_000}, {'members': 100_000}, {'members': 500_000, 'full': True}],
+    'join_burst': [{'joins': 100}, {'joins': 1_000}, {'joins': 10_000}],
+    'save_pending': [{'pending': 100}, {'pending': 1_000}, {'pending': 10_000}, {'pending': 100_000}],
+}
+
+class LoopMonitor:
+    """Measures how long the event loop goes without getting back to a short-sleeping task"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.max_block = 0.0
+        self.total_block = 0.0
+        self.task = None
+
+    async def run(self):
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - started_at - self.interval
+            if lag > self.interval:
+                self.total_block += lag
+                self.max_block = max(self.max_block, lag)
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self):
+        self.task.cancel()
+
+async def stop_background_tasks():
+    """Cancel the bot's worker tasks, re-cancelling any that swallow it
+
+    wait_for() on Python 3.11 can drop a cancellation that races with its inner wait
+    finishing (the write-behind loop's wakeup fires constantly during a backfill), which
+    would leave asyncio.run() waiting for that task forever.
+    """
+    current = asyncio.current_task()
+    for task in asyncio.all_tasks() - {current}:
+        while not task.done():
+            task.cancel()
+            await asyncio.sleep(0)
+
+def max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024  # bytes on macOS, KiB elsewhere
+
+# Scenarios - each setup builds the fake guild and bot state and returns the coroutine to time
+
+def setup_guild(intro_bot, fakes, api, members, storage_backend):
+    if storage_backend == 'sqlite':
+        intro_bot.STORAGE_BACKEND = 'sqlite'
+        intro_bot.storage = intro_bot.create_storage()
+    guild = fakes.FakeGuild(api, GUILD_ID, members)
+    for channel_id in (INTRO_CHANNEL_ID, MOD_LOG_CHANNEL_ID, GENERAL_CHANNEL_ID):
+        guild.add_channel(channel_id)
+    fakes.install(intro_bot.bot, api, [guild])
+    config = intro_bot.get_default_config()
+    config.update(intro_channel_id=INTRO_CHANNEL_ID, mod_log_channel_id=MOD_LOG_CHANNEL_ID)
+    intro_bot.save_guild_config(GUILD_ID, config)
+    intro_bot.guild_data_cache.pop(str(GUILD_ID), None)
+    return guild
+
+def add_pending(intro_bot, guild, count, joined_hours_ago):
+    pending_members = intro_bot.get_guild_data(GUILD_ID)['pending']
+    join_ts = int(time.time() - joined_hours_ago * 3600)
+    for member in guild.members[:count]:
+        pending_members[member.id] = intro_bot.PendingEntry(join_ts)
+        intro_bot.schedule_pending_member(GUILD_ID, member.id, pending_members[member.id])
+
+async def drain(intro_bot):
+    """Wait for queued DMs, mod log batches and writes to finish"""
+    await intro_bot.dm_queue.join()
+    await intro_bot.flush_mod_logs()
+    await intro_bot.flush_dirty_guilds()
+
+async def run_due_members(intro_bot):
+    for guild_id, user_ids in intro_bot.pop_due_members(time.time()).items():
+        with intro_bot.hold_guild_data(guild_id):
+            await intro_bot.process_due_members(intro_bot.bot.get_guild(int(guild_id)), user_ids)
+    await drain(intro_bot)
+
+def setup_on_message(intro_bot, fakes, api, params, storage_backend):
+    guild = setup_guild(intro_bot, fakes, api, params['members'], storage_backend)
+    intro_bot.get_guild_data(GUILD_ID)
+    members = guild.members
+    # 10,000 messages, 1% of them intros from pending members
+    add_pending(intro_bot, guild, 100, joined_hours_ago=1)
+    messages = []
+    for i in range(10_000):
+        if i % 100 == 0:
+            messages.append(fakes.FakeMessage(api, i, members[i // 100], guild.channels[INTRO_CHANNEL_ID]))
+        else:
+            messages.append(fakes.FakeMessage(api, i, members[i % len(members)], guild.channels[GENERAL_CHANNEL_ID]))
+
+    async def run():
+        for message in messages:
+            await intro_bot.on_message(message)
+        await drain(intro_bot)
+    return run()
+
+def setup_check_reminders(intro_bot, fakes, api, params, storage_backend):
+    guild = setup_guild(intro_bot, fakes, api, params['pending'], storage_backend)
+    add_pending(intro_bot, guild, params['pending'], joined_hours_ago=13)
+    return run_due_members(intro_bot)
+
+def setup_check_kicks(intro_bot, fakes, api, params, storage_backend):
+    guild = setup_guild(intro_bot, fakes, api, params['pending'], storage_backend)
+    add_pending(intro_bot, guild, params['pending'], joined_hours_ago=25)
+    intro_bot.ENABLE_KICKING = True
+    intro_bot.DRY_RUN_MODE = False
+    return run_due_members(intro_bot)
+
+def setup_scan_history(intro_bot, fakes, api, params, storage_backend):
+    guild = setup_guild(intro_bot, fakes, api, params['messages'], storage_backend)
+    intro_channel = guild.channels[INTRO_CHANNEL_ID]
+    # Half the intros already have their ✅, the rest get queued for the (rate-limited) backfill worker
+    for i, member in enumerate(guild.members):
+        reactions = [fakes.FakeReaction('✅')] if i % 2 else []
+        intro_channel.messages.append(fakes.FakeMessage(api, i + 1, member, intro_channel, reactions=reactions))
+
+    async def run():
+        await intro_bot.scan_intro_channel_history(str(GUILD_ID), INTRO_CHANNEL_ID)
+        await drain(intro_bot)
+    return run()
+
+def setup_track_existing(intro_bot, fakes, api, params, storage_backend):
+    guild = setup_guild(intro_bot, fakes, api, params['members'], storage_backend)
+    intro_bot.ENABLE_BACKGROUND_CHECKS = True  # So welcome DMs are queued like in production
+
+    async def run():
+        await intro_bot.track_existing.callback(fakes.FakeContext(guild), 72)
+        await drain(intro_bot)
+    return run()
+
+def setup_join_burst(intro_bot, fakes, api, params, storage_backend):
+    guild = setup_guild(intro_bot, fakes, api, 0, storage_backend)
+    new_members = [guild.add_member(10 ** 17 + i) for i in range(params['joins'])]
+
+    async def run():
+        for member in new_members:
+            await intro_bot.on_member_join(member)
+        await drain(intro_bot)
+    return run()
+
+def setup_save_pending(intro_bot, fakes, api, params, storage_backend):
+    guild = setup_guild(intro_bot, fakes, api, params['pending'], storage_backend)
+    add_pending(intro_bot, guild, params['pending'], joined_hours_ago=1)
+
+    async def run():
+        # One full save, then 100 single-member changes written as they would be in production
+        intro_bot.mark_guild_dirty(GUILD_ID, 'pending')
+        await intro_bot.flush_dirty_guilds()
+        pending_members = intro_bot.get_guild_data(GUILD_ID)['pending']
+        for member in guild.members[:100]:
+            pending_members[member.id].reminded |= intro_bot.get_reminder_bit(0)
+            intro_bot.mark_guild_dirty(GUILD_ID, 'pending', [member.id], reason='reminded')
+            await intro_bot.flush_dirty_guilds()
+    return run()
+
+SETUPS = {
+    'on_message': setup_on_message,
+    'check_reminders': setup_check_reminders,
+    'check_kicks': setup_check_kicks,
+    'scan_history': setup_scan_history,
+    'track_existing': setup_track_existing,
+    'join_burst': setup_join_burst,
+    'save_pending': setup_save_pending,
+}
+
+def run_one(scenario, params, options):
+    """Run a single scenario in this process (called in the subprocess) and return its result"""
+    sys.path[:0] = [REPO_DIR, BENCH_DIR]
+    import fakes
+    import intro_bot
+
+    # Retry backoff in seconds would dominate runs with simulated 429s
+    intro_bot.DM_RETRY_BASE_SECONDS = 0.01
+    api = fakes.FakeAPI(options['latency_ms'], options['rate_limit'])
+
+    async def main():
+        with contextlib.redirect_stdout(io.StringIO()):
+            coroutine = SETUPS[scenario](intro_bot, fakes, api, params, options['storage'])
+        api.calls.clear()
+        setup_rss = max_rss_mb()
+        monitor = LoopMonitor()
+        monitor.start()
+        started_at = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await coroutine
+        wall_seconds = time.perf_counter() - started_at
+        monitor.stop()
+        await stop_background_tasks()
+        return {
+            'wall_seconds': round(wall_seconds, 4),
+            'api_calls': dict(sorted(api.calls.items())),
+            'api_call_total': api.total_calls(),
+            'rate_limited': api.rate_limited,
+            'setup_rss_mb': round(setup_rss, 1),
+            'peak_rss_mb': round(max_rss_mb(), 1),
+            'loop_blocked_seconds': round(monitor.total_block, 4),
+            'max_loop_block_ms': round(monitor.max_block * 1000, 1),
+        }
+
+    return asyncio.run(main())
+
+def run_in_subprocess(scenario, params, options):
+    with tempfile.TemporaryDirectory() as work_dir:
+        result_file = os.path.join(work_dir, 'result.json')
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-one', scenario, json.dumps(params), json.dumps(options), result_file],
+            cwd=work_dir, check=True
+        )
+        with open(result_file) as f:
+            return json.load(f)
+
+def describe(params):
+    return ', '.join(f'{key}={value:,}' for key, value in params.items() if key != 'full')
+
+def get_git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'current'
+
+def print_comparison(results, baseline_file):
+    with open(baseline_file) as f:
+        baseline = {(run['scenario'], describe(run['params'])): run['result'] for run in json.load(f)['runs']}
+    print(f"\nCompared with {baseline_file} (ratio < 1.00 is faster/smaller):")
+    for run in results:
+        before = baseline.get((run['scenario'], describe(run['params'])))
+        if before is None:
+            continue
+        after = run['result']
+        wall_ratio = after['wall_seconds'] / before['wall_seconds'] if before['wall_seconds'] else float('inf')
+        calls_ratio = after['api_call_total'] / before['api_call_total'] if before['api_call_total'] else 1.0
+        print(
+            f"  {run['scenario']:<16} {describe(run['params']):<18} wall {wall_ratio:5.2f}x  "
+            f"api calls {calls_ratio:5.2f}x  peak RSS {after['peak_rss_mb'] - before['peak_rss_mb']:+.1f}MB"
+        )
+
+def main():
+    if len(sys.argv) == 6 and sys.argv[1] == '--run-one':
+        _, _, scenario, params, options, result_file = sys.argv
+        result = run_one(scenario, json.loads(params), json.loads(options))
+        with open(result_file, 'w') as f:
+            json.dump(result, f)
+        return
+
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks")
+    parser.add_argument('--only', action='append', choices=sorted(SCENARIOS), help="Run only this scenario (repeatable)")
+    parser.add_argument('--full', action='store_true', help="Include the largest sizes (500k members, 100k pending)")
+    parser.add_argument('--latency-ms', type=float, default=0, help="Simulated latency of every API call")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="Fraction of API calls answered with a 429")
+    parser.add_argument('--storage', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--label', help="Name of the results file (default: current git revision)")
+    parser.add_argument('--compare', help="Results file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    options = {'latency_ms': args.latency_ms, 'rate_limit': args.rate_limit, 'storage': args.storage}
+    results = []
+    for scenario in args.only or SCENARIOS:
+        for params in SCENARIOS[scenario]:
+            if params.get('full') and not args.full:
+                continue
+            params = {key: value for key, value in params.items() if key != 'full'}
+            result = run_in_subprocess(scenario, params, options)
+            results.append({'scenario': scenario, 'params': params, 'result': result})
+            print(
+                f"{scenario:<16} {describe(params):<18} {result['wall_seconds']:9.3f}s  "
+                f"{result['api_call_total']:>8,} API calls  peak {result['peak_rss_mb']:7.1f}MB  "
+                f"loop blocked {result['loop_blocked_seconds']:.3f}s (max {result['max_loop_block_ms']:.0f}ms)"
+            )
+
+    label = args.label or get_git_revision()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_file = os.path.join(RESULTS_DIR, f'{label}.json')
+    with open(results_file, 'w') as f:
+        json.dump({'label': label, 'options': options, 'python': sys.version.split()[0], 'runs': results}, f, indent=2)
+    print(f"\nSaved results to {os.path.relpath(results_file)}")
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -22,4 +22,18 @@ module.exports = {
     max_restarts: 3,
     restart_delay: 4000
   }]
+  // Sharded: replace the app above with one app per shard, e.g. for 2 shards
+  // apps: [0, 1].map((shard) => ({
+  //   name: `allo-bot-shard-${shard}`,
+  //   script: 'intro_bot.py',
+  //   interpreter: 'python3',
+  //   instances: 1,
+  //   autorestart: true,
+  //   max_memory_restart: '500M',
+  //   env: { NODE_ENV: 'production', SHARD_COUNT: 2, SHARD_ID: shard },
+  //   out_file: `./logs/out-${shard}.log`,
+  //   error_file: `./logs/err-${shard}.log`,
+  //   time: true,
+  //   cron_restart: '0 3 * * *'
+  // }))
 };
@@ -1,8 +1,31 @@
 import discord
 from discord.ext import commands, tasks
+import aiohttp
+from aiohttp import web
+import asyncio
+import cProfile
+import heapq
 import json
+import logging
+import logging.handlers
+import mmap
 import os
-from datetime import datetime, timedelta
+import pstats
+import queue
+import random
+import re
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from itertools import islice
 
 # Bot configuration
 INTENTS = discord.Intents.default()
@@ -10,14 +33,72 @@ INTENTS.members = True
 INTENTS.message_content = True
 INTENTS.guilds = True
 
-bot = commands.Bot(command_prefix='!', intents=INTENTS)
+# Member cache - 'full' chunks every guild at startup, so every member is in memory. 'lazy'
+# only chunks guilds of up to LAZY_CHUNK_MAX_MEMBERS; elsewhere members are cached as they join
+# or are looked up (due pending members are resolved in batches with query_members).
+MEMBER_CACHE_MODE = 'full'  # 'full' or 'lazy'
+LAZY_CHUNK_MAX_MEMBERS = 1000  # Lazy mode still chunks guilds this small at startup
+
+# Sharding - SHARD_COUNT alone runs every shard in this process; adding SHARD_ID runs just that
+# shard, so several processes (one PM2 app per shard) split the guilds between their event loops.
+# Each process only loads, scans and checks the guilds of its own shard.
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0')) or None
+SHARD_ID = int(os.getenv('SHARD_ID')) if os.getenv('SHARD_ID') else None
+
+def get_guild_shard(guild_id):
+    """Shard a guild belongs to (Discord's formula: (guild_id >> 22) % shard_count)"""
+    return (int(guild_id) >> 22) % SHARD_COUNT
+
+def owns_guild(guild_id):
+    """Whether this process is responsible for a guild's data"""
+    return SHARD_ID is None or get_guild_shard(guild_id) == SHARD_ID
+
+class AlloBot(commands.AutoShardedBot if SHARD_COUNT else commands.Bot):
+    """Bot that flushes queued state writes before it disconnects"""
+
+    async def setup_hook(self):
+        # PM2 stops/restarts the process with SIGTERM - close cleanly so pending writes are flushed
+        try:
+            loop = asyncio.get_running_loop()
+            loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(self.close()))
+            # kill -USR1 <pid> profiles the next few check loop passes (summary goes to the console)
+            loop.add_signal_handler(signal.SIGUSR1, self.profile_from_signal)
+        except (NotImplementedError, AttributeError):
+            pass  # Signal handlers (or SIGUSR1) aren't supported on this platform (e.g. Windows)
+        await start_metrics_server()
+
+    def profile_from_signal(self):
+        error = request_profile('checks', PROFILE_SIGNAL_PASSES)
+        if error:
+            profile_logger.warning(error, extra=log_fields('profile_rejected'))
+        else:
+            profile_logger.info("SIGUSR1: profiling the next %d check loop passes", PROFILE_SIGNAL_PASSES, extra=log_fields('profile_armed'))
+
+    async def close(self):
+        await flush_mod_logs()
+        checkpoint_backfills()
+        compact_all_tombstones()
+        await flush_dirty_guilds()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await super().close()
+
+bot_options = {'command_prefix': '!', 'intents': INTENTS}
+if SHARD_COUNT:
+    bot_options.update(shard_count=SHARD_COUNT, shard_ids=None if SHARD_ID is None else [SHARD_ID])
+if MEMBER_CACHE_MODE == 'lazy':
+    member_cache_flags = discord.MemberCacheFlags.none()
+    member_cache_flags.joined = True  # Keep members who join or are looked up - not everyone seen in voice
+    bot_options.update(chunk_guilds_at_startup=False, member_cache_flags=member_cache_flags)
+bot = AlloBot(**bot_options)
 
 # Global configuration (applies to all guilds)
 GRACE_PERIOD_HOURS = 24  # Time users have to post before being kicked
-CHECK_INTERVAL_MINUTES = 60  # How often to check for non-introduced members
+CHECK_INTERVAL_MINUTES = 60  # Max scheduler sleep, and how often safety-mode/deferred members are re-checked
 REMINDER_TIMES = [12]  # Hours after join to send reminders
 MIN_INTRO_LENGTH = 0  # Minimum intro message length (0 = disabled)
 REQUIRE_KEYWORDS = []  # Keywords required in intro (empty = disabled)
+KEYWORD_WHOLE_WORDS = False  # Match keywords as whole words ("name" won't match "username")
 BOOSTER_GRACE_HOURS = 0  # Extra hours for server boosters (0 = same as normal)
 
 # Safety settings
@@ -25,18 +106,376 @@ ENABLE_KICKING = False  # MUST be True to actually kick members (safety switch)
 DRY_RUN_MODE = True  # If True, logs what would happen but doesn't kick
 ENABLE_BACKGROUND_CHECKS = False  # If False, disables reminder/kick loop entirely (testing mode)
 STARTUP_GRACE_PERIOD_HOURS = 24  # Extra hours added to existing members on first startup
+STARTUP_SCAN_CONCURRENCY = 4  # How many guilds' intro channels are scanned at once on startup
+MOD_LOG_FLUSH_SECONDS = 5  # Mod log events are batched into one embed for up to this long
+MOD_LOG_MAX_BUFFERED_LINES = 200  # Per guild - further events are only counted in a "+N more" summary
+DM_WORKER_COUNT = 4  # DMs delivered in parallel
+DM_MAX_ATTEMPTS = 5  # Tries per DM when Discord answers 429/5xx
+DM_RETRY_BASE_SECONDS = 2  # First retry delay, doubled on each further attempt
+DM_KICK_NOTICE_TIMEOUT_SECONDS = 30  # How long a kick waits for its "you have been removed" DM
+SCAN_PAGE_SIZE = 100  # Messages per history request (Discord's maximum)
+SCAN_PAGE_PAUSE_SECONDS = 0.1  # Pause between history pages so long scans leave room for live traffic
+SCAN_CHECKPOINT_PAGES = 50  # Save a history scan's progress (and log its throughput) every this many pages
+REACTIONS_PER_MINUTE = 20  # Budget for adding ✅ to old intros found by scans (new intros are reacted to right away)
+BACKFILL_CHECKPOINT_ITEMS = 100  # Backfill progress is saved every this many items - a crash only repeats these
+ROLE_BACKFILL_WORKERS = 2  # Welcome roles assigned in parallel by !rolebackfill
+ROLES_PER_MINUTE = 60  # Budget for !rolebackfill across all workers and servers
+STATS_RECONCILE_MINUTES = 60  # How often the !stats member counters are recounted to correct any drift
+
+# Persistence settings
+SAVE_DEBOUNCE_SECONDS = 2  # Write a guild's data once it has been quiet this long
+SAVE_MAX_DELAY_SECONDS = 10  # ...but never hold changes back longer than this
+STORAGE_BACKEND = 'json'  # 'json' (per-guild files) or 'sqlite' (run with --migrate-to-sqlite first)
+SQLITE_DATABASE = 'allo.db'  # Database file used by the sqlite backend
+JOURNAL_COMPACT_MIN_ENTRIES = 1000  # json backend: pending journal lines before it may be compacted
+TOMBSTONE_COMPACT_SECONDS = 300  # How often introduced entries of departed members are compacted away
+GUILD_CACHE_MAX_GUILDS = 500  # Guilds kept in memory - idle ones beyond this are dropped and reloaded on demand
+GUILD_CACHE_PIN_MINUTES = 60  # Keep guilds with a reminder/kick due this soon in memory
+
+# Metrics settings
+METRICS_PORT = 0  # Serve Prometheus metrics on http://METRICS_HOST:METRICS_PORT/metrics (0 = disabled, shard N uses METRICS_PORT + N)
+METRICS_HOST = '127.0.0.1'  # Local only by default - scrape it from the same machine
+
+# Profiling settings (see !profile - or send the process SIGUSR1)
+PROFILE_DIR = 'profiles'  # Where .pstats and memory diff files are written
+PROFILE_TOP_N = 15  # Functions/allocation sites listed in the mod log summary
+PROFILE_SIGNAL_PASSES = 5  # Check loop passes profiled after a SIGUSR1
+
+# Logging settings - subsystems: allo.bot, allo.storage, allo.scan, allo.dm, allo.reactions,
+# allo.members, allo.checks, allo.modlog, allo.profile (and discord for the library itself)
+LOG_FORMAT = 'json'  # 'json' (one object per line, for log shippers) or 'text'
+LOG_LEVEL = 'INFO'  # Default level for every subsystem
+LOG_LEVELS = {}  # Per-subsystem overrides, e.g. {'allo.members': 'WARNING', 'allo.checks': 'WARNING'}
+
+# Logging - loggers only put records on a queue; a QueueListener thread formats them and writes
+# them to stdout, so a burst of log lines never blocks the event loop. Messages use %-style
+# arguments so even the string formatting happens on that thread.
+bot_logger = logging.getLogger('allo.bot')
+storage_logger = logging.getLogger('allo.storage')
+scan_logger = logging.getLogger('allo.scan')
+dm_logger = logging.getLogger('allo.dm')
+reaction_logger = logging.getLogger('allo.reactions')
+member_logger = logging.getLogger('allo.members')
+check_logger = logging.getLogger('allo.checks')
+mod_log_logger = logging.getLogger('allo.modlog')
+profile_logger = logging.getLogger('allo.profile')
+log_listener = None
+
+def log_fields(event, guild_id=None, user_id=None, duration=None, **fields):
+    """Structured fields for a log record - pass as extra=log_fields(...)"""
+    record_fields = {'event': event}
+    if guild_id is not None:
+        record_fields['guild_id'] = str(guild_id)  # Snowflakes as strings - JSON readers lose precision above 2^53
+    if user_id is not None:
+        record_fields['user_id'] = str(user_id)
+    if duration is not None:
+        record_fields['duration_ms'] = round(duration * 1000, 1)
+    record_fields.update(fields)
+    return {'fields': record_fields}
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the record's fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextLogFormatter(logging.Formatter):
+    """Human-readable lines with the record's fields appended as key=value"""
+
+    def format(self, record):
+        line = f"{record.levelname} {record.name}: {record.getMessage()}"
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread (records never leave the process)"""
+
+    def prepare(self, record):
+        return record
+
+def setup_logging():
+    """Route all logging (ours and discord.py's) through the queue to stdout"""
+    global log_listener
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonLogFormatter() if LOG_FORMAT == 'json' else TextLogFormatter())
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [DeferredQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+    for name, level in LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+    log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    log_listener.start()
+
+def stop_logging():
+    """Write out everything still queued"""
+    if log_listener is not None:
+        log_listener.stop()
+
+# Metrics - counters and histograms are updated where things happen; gauges are read when
+# Prometheus scrapes /metrics, so nothing is computed unless someone is looking
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+METRIC_HELP = {
+    'allo_joins_total': ('counter', 'Members who joined and are now tracked'),
+    'allo_intros_total': ('counter', 'Introductions posted by tracked members'),
+    'allo_reminders_total': ('counter', 'Reminder DMs delivered'),
+    'allo_kicks_total': ('counter', 'Members kicked for not introducing themselves'),
+    'allo_dm_failures_total': ('counter', 'DMs that could not be delivered, by reason'),
+    'allo_check_loop_seconds': ('histogram', 'Duration of one check_introductions pass'),
+    'allo_history_scan_seconds': ('histogram', 'Duration of one intro channel history scan'),
+    'allo_persistence_seconds': ('histogram', 'Time spent writing guild data, by kind'),
+    'allo_discord_api_seconds': ('histogram', 'Latency of Discord API calls, by call'),
+    'allo_pending_members': ('gauge', 'Members awaiting introduction (cached guilds)'),
+    'allo_introduced_members': ('gauge', 'Introduced members (cached guilds)'),
+    'allo_guild_cache_size': ('gauge', 'Guilds held in the guild data cache'),
+    'allo_dm_queue_size': ('gauge', 'DMs waiting to be delivered'),
+    'allo_scheduled_members': ('gauge', 'Pending members in the reminder/kick schedule'),
+    'allo_shard_connected': ('gauge', 'Whether a shard run by this process is connected (1) or not (0)'),
+    'allo_shard_latency_seconds': ('gauge', 'Gateway heartbeat latency, by shard'),
+    'allo_shard_guilds': ('gauge', 'Guilds served, by shard'),
+}
+metric_counters = {}  # {(name, labels): value}
+metric_histograms = {}  # {(name, labels): [count per bucket..., +Inf count, sum, count]}
+metrics_runner = None
+
+def inc_counter(name, amount=1, **labels):
+    """Add to a counter (labels are keyword arguments, e.g. guild='123')"""
+    key = (name, tuple(sorted(labels.items())))
+    metric_counters[key] = metric_counters.get(key, 0) + amount
+
+def observe(name, seconds, **labels):
+    """Record one duration in a histogram"""
+    key = (name, tuple(sorted(labels.items())))
+    histogram = metric_histograms.get(key)
+    if histogram is None:
+        histogram = metric_histograms[key] = [0] * (len(METRIC_BUCKETS) + 3)
+    histogram[bisect_left(METRIC_BUCKETS, seconds)] += 1
+    histogram[-2] += seconds
+    histogram[-1] += 1
+
+@contextmanager
+def observe_duration(name, **labels):
+    """Time the body of a with block (awaits included) into a histogram"""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started_at, **labels)
+
+def format_labels(labels, **extra):
+    labels = list(labels) + list(extra.items())
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+def get_gauges():
+    """Read the current gauge values as [(name, labels, value)]"""
+    gauges = [
+        ('allo_guild_cache_size', (), len(guild_data_cache)),
+        ('allo_dm_queue_size', (), dm_queue.qsize()),
+        ('allo_scheduled_members', (), len(pending_schedule_due)),
+    ]
+    for guild_id, guild_data in guild_data_cache.items():
+        gauges.append(('allo_pending_members', (('guild', guild_id),), len(guild_data['pending'])))
+        gauges.append(('allo_introduced_members', (('guild', guild_id),), len(guild_data['introduced'])))
+    if SHARD_COUNT:
+        for shard_id, health in get_shard_health().items():
+            labels = (('shard', shard_id),)
+            gauges.append(('allo_shard_connected', labels, int(health['connected'])))
+            gauges.append(('allo_shard_latency_seconds', labels, health['latency']))
+            gauges.append(('allo_shard_guilds', labels, health['guilds']))
+    return gauges
+
+def get_shard_health():
+    """Connection state, latency and guild count of each shard run by this process"""
+    guild_counts = {}
+    for guild in bot.guilds:
+        guild_counts[guild.shard_id] = guild_counts.get(guild.shard_id, 0) + 1
+    health = {}
+    for shard_id, shard in bot.shards.items():
+        latency = shard.latency
+        health[shard_id] = {
+            'connected': not shard.is_closed(),
+            'latency': latency if latency == latency else 0,  # NaN until the first heartbeat
+            'guilds': guild_counts.get(shard_id, 0),
+            **shard_stats.get(shard_id, {'disconnects': 0, 'resumes': 0}),
+        }
+    return health
+
+def render_metrics():
+    """Render every metric in the Prometheus text exposition format"""
+    samples = {}  # {name: [sample lines]}
+    for (name, labels), value in metric_counters.items():
+        samples.setdefault(name, []).append(f'{name}{format_labels(labels)} {value}')
+    for (name, labels), histogram in metric_histograms.items():
+        lines = samples.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(METRIC_BUCKETS + ('+Inf',), histogram):
+            cumulative += count
+            lines.append(f'{name}_bucket{format_labels(labels, le=bound)} {cumulative}')
+        lines.append(f'{name}_sum{format_labels(labels)} {histogram[-2]}')
+        lines.append(f'{name}_count{format_labels(labels)} {histogram[-1]}')
+    for name, labels, value in get_gauges():
+        samples.setdefault(name, []).append(f'{name}{format_labels(labels)} {value}')
+
+    output = []
+    for name, lines in samples.items():
+        metric_type, help_text = METRIC_HELP[name]
+        output.append(f'# HELP {name} {help_text}')
+        output.append(f'# TYPE {name} {metric_type}')
+        output.extend(lines)
+    return '\n'.join(output) + '\n'
+
+async def start_metrics_server():
+    """Serve /metrics on METRICS_HOST:METRICS_PORT (no-op when METRICS_PORT is 0)"""
+    global metrics_runner
+    if not METRICS_PORT or metrics_runner is not None:
+        return
 
-# Per-guild file storage - each guild gets its own files
+    async def handle_metrics(request):
+        return web.Response(text=render_metrics(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    metrics_runner = web.AppRunner(app, access_log=None)
+    await metrics_runner.setup()
+    port = METRICS_PORT + (SHARD_ID or 0)  # One port per shard process
+    await web.TCPSite(metrics_runner, METRICS_HOST, port).start()
+    bot_logger.info("Metrics available at http://%s:%d/metrics", METRICS_HOST, port, extra=log_fields('metrics_started'))
+
+# Profiling - armed on demand by !profile or SIGUSR1 for the next few check loop passes or
+# the next history scan. While nothing is armed profile_section is a dict lookup returning a
+# shared nullcontext, so the loop pays nothing for it.
+PROFILE_TARGETS = {'checks': 'check loop pass', 'scan': 'history scan'}
+profile_requests = {}  # {target: {'remaining': passes, 'guild_id': str or None, 'profiler': Profile, 'memory_start': Snapshot, 'started_tracing': bool, 'active': bool}}
+
+def request_profile(target, passes=1, guild_id=None):
+    """Arm profiling for the next passes of target - returns an error message, or None"""
+    if profile_requests:
+        # cProfile can only have one profiler enabled at a time
+        armed = next(iter(profile_requests))
+        return f"Profiling is already armed for the {PROFILE_TARGETS[armed]} - wait for it to finish or cancel it."
+    if target == 'checks' and not check_introductions.is_running():
+        return "The check loop isn't running (ENABLE_BACKGROUND_CHECKS is False), so there is nothing to profile."
+    profile_requests[target] = {
+        'remaining': passes, 'guild_id': guild_id, 'profiler': None,
+        'memory_start': None, 'started_tracing': False, 'active': False,
+    }
+    return None
+
+def cancel_profile():
+    """Disarm profiling - returns a message saying what happened"""
+    if not profile_requests:
+        return "Profiling isn't armed."
+    target, request = next(iter(profile_requests.items()))
+    if request['active']:
+        # The pass in progress has the profiler enabled - stop after it and report what it saw
+        request['remaining'] = 1
+        return f"The {PROFILE_TARGETS[target]} being profiled is still running - profiling stops once it finishes."
+    del profile_requests[target]
+    if request['started_tracing']:
+        tracemalloc.stop()
+    return f"Profiling of the {PROFILE_TARGETS[target]} cancelled."
+
+def profile_section(target):
+    """Profile the body of a with block if target is armed (no-op context otherwise)"""
+    request = profile_requests.get(target)
+    if request is None or request['active']:
+        return nullcontext()  # Concurrent scans: only the first one in is profiled
+    return run_profile_section(target, request)
+
+@contextmanager
+def run_profile_section(target, request):
+    """Profile one pass - awaits inside it run other tasks, so their code shows up too"""
+    if request['profiler'] is None:
+        request['profiler'] = cProfile.Profile()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            request['started_tracing'] = True
+        request['memory_start'] = tracemalloc.take_snapshot()
+
+    request['active'] = True
+    request['profiler'].enable()
+    try:
+        yield
+    finally:
+        request['profiler'].disable()
+        request['active'] = False
+        request['remaining'] -= 1
+        if request['remaining'] <= 0:
+            del profile_requests[target]
+            finish_profile(target, request)
+
+def finish_profile(target, request):
+    """Write the pstats and memory diff files and post a top-N summary"""
+    memory_end = tracemalloc.take_snapshot()
+    if request['started_tracing']:
+        tracemalloc.stop()
+    memory_diff = memory_end.compare_to(request['memory_start'], 'lineno')
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{target}_{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}")
+    request['profiler'].dump_stats(f'{base}.pstats')
+    with open(f'{base}_memory.txt', 'w') as f:
+        for stat in memory_diff:
+            f.write(f'{stat}\n')
+
+    stats = pstats.Stats(request['profiler'])
+    top_functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_N]
+    lines = [f"🔬 Profile of {PROFILE_TARGETS[target]} ({stats.total_tt:.2f}s total) - saved to `{base}.pstats`", "```"]
+    for (filename, line, function), (_, calls, _, cumulative, _) in top_functions:
+        lines.append(f"{cumulative:8.3f}s {calls:>8} {function} ({os.path.basename(filename)}:{line})")
+    lines.append("```")
+    lines.append(f"Memory growth (`{base}_memory.txt`):")
+    lines.append("```")
+    for stat in memory_diff[:5]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size_diff / 1024:+10.1f} KiB {os.path.basename(frame.filename)}:{frame.lineno}")
+    lines.append("```")
+
+    summary = '\n'.join(lines)
+    profile_logger.info(summary, extra=log_fields('profile_finished', request['guild_id'], target=target, pstats=f'{base}.pstats'))
+    if request['guild_id'] is not None:
+        log_to_mod_channel(request['guild_id'], summary, discord.Color.blurple(), kind='profiles')
+
+# Storage backends - both expose the same load/save methods, so get_guild_data and the
+# write-behind writer work on top of either one (see STORAGE_BACKEND)
 def get_guild_file(guild_id, file_type):
     """Get the filename for a specific guild and file type"""
     return f'{file_type}_{guild_id}.json'
 
-def load_guild_config(guild_id):
-    """Load configuration for a specific guild"""
-    filename = get_guild_file(guild_id, 'config')
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            return json.load(f)
+def write_json_file(filename, data, indent=None):
+    """Write JSON to a temp file and swap it in, so a crash never leaves a truncated file"""
+    temp_filename = f'{filename}.tmp'
+    with open(temp_filename, 'w') as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_filename, filename)
+
+def get_introduced_sidecar(guild_id):
+    """Get the binary file of introduced member IDs for a guild (supersedes introduced_<guild>.json)"""
+    return f'introduced_{guild_id}.bin'
+
+def get_journal_file(guild_id):
+    """Get the filename of a guild's pending-changes journal"""
+    return f'pending_{guild_id}.journal'
+
+def get_default_config():
+    """Get the configuration for a guild that hasn't been set up yet"""
     return {
         'intro_channel_id': 0,
         'mod_log_channel_id': 0,
@@ -44,62 +483,1053 @@ def load_guild_config(guild_id):
         'exempt_role_ids': []
     }
 
+# Pending members are held as compact records - epoch-second times, a reminder bitmask and
+# DM statuses packed 2 bits each - and only converted to/from JSON when loaded or saved.
+# Stored records are [join_ts, deadline_ts, reminded hours, reminded_24h_remaining, {dm key: status}]
+# (reminders by hour, so changing REMINDER_TIMES doesn't shift them); legacy entries still load.
+REMINDED_24H_REMAINING = 1  # Bit 0 of PendingEntry.reminded - REMINDER_TIMES[i] uses bit i + 1
+DM_STATUS_CODES = (None, 'sent', 'forbidden', 'failed')
+DM_STATUS_SLOTS = {'welcome': 0, 'reminder_24h_remaining': 1}  # status_key -> 2-bit slot in PendingEntry.dm_status
+DM_STATUS_SLOTS.update({f'reminder_{reminder_hour}': i + 2 for i, reminder_hour in enumerate(REMINDER_TIMES)})
+
+def parse_timestamp(iso_string):
+    """Convert a stored ISO timestamp (naive UTC) to epoch seconds"""
+    return datetime.fromisoformat(iso_string).replace(tzinfo=timezone.utc).timestamp()
+
+def get_reminder_bit(index):
+    """Get the PendingEntry.reminded bit for REMINDER_TIMES[index]"""
+    return 1 << (index + 1)
+
+class PendingEntry:
+    """A member who hasn't introduced themselves yet (pending dicts map int user IDs to these)"""
+
+    __slots__ = ('join_ts', 'deadline_ts', 'reminded', 'dm_status')
+
+    def __init__(self, join_ts, deadline_ts=0, reminded=0, dm_status=0):
+        self.join_ts = join_ts  # Epoch seconds - start of the grace period
+        self.deadline_ts = deadline_ts  # Custom kick deadline from !trackexisting (0 = use the grace period)
+        self.reminded = reminded  # Bitmask of reminders already sent
+        self.dm_status = dm_status  # DM_STATUS_CODES index per DM_STATUS_SLOTS slot
+
+    def get_deadline(self, grace_hours=GRACE_PERIOD_HOURS):
+        """Get the epoch time this member gets kicked"""
+        return self.deadline_ts or self.join_ts + grace_hours * 3600
+
+    def get_dm_status(self, status_key):
+        """Get the delivery status of a queued DM ('sent', 'forbidden', 'failed' or None)"""
+        return DM_STATUS_CODES[self.dm_status >> 2 * DM_STATUS_SLOTS[status_key] & 3]
+
+    def set_dm_status(self, status_key, status):
+        shift = 2 * DM_STATUS_SLOTS[status_key]
+        self.dm_status = self.dm_status & ~(3 << shift) | DM_STATUS_CODES.index(status) << shift
+
+    def to_record(self):
+        """Convert to the stored JSON form"""
+        reminded_hours = [reminder_hour for i, reminder_hour in enumerate(REMINDER_TIMES) if self.reminded & get_reminder_bit(i)]
+        dm_statuses = {key: self.get_dm_status(key) for key in DM_STATUS_SLOTS if self.get_dm_status(key)}
+        return [self.join_ts, self.deadline_ts, reminded_hours, bool(self.reminded & REMINDED_24H_REMAINING), dm_statuses]
+
+    @classmethod
+    def from_record(cls, value):
+        """Build an entry from its stored form - a record, a legacy dict or a bare join time string"""
+        if isinstance(value, str):
+            # Oldest format - just the ISO join time
+            value = {'join_time': value}
+        if isinstance(value, dict):
+            # Legacy format - ISO timestamps and reminded_<hour>/dm_<key> flags
+            value = [
+                int(parse_timestamp(value['join_time'])),
+                int(parse_timestamp(value['deadline'])) if 'deadline' in value else 0,
+                [reminder_hour for reminder_hour in REMINDER_TIMES if value.get(f'reminded_{reminder_hour}', False)],
+                value.get('reminded_24h_remaining', False),
+                {key: value[f'dm_{key}'] for key in DM_STATUS_SLOTS if f'dm_{key}' in value}
+            ]
+
+        join_ts, deadline_ts, reminded_hours, reminded_24h_remaining, dm_statuses = value
+        entry = cls(join_ts, deadline_ts, REMINDED_24H_REMAINING if reminded_24h_remaining else 0)
+        for i, reminder_hour in enumerate(REMINDER_TIMES):
+            if reminder_hour in reminded_hours:
+                entry.reminded |= get_reminder_bit(i)
+        for key, status in dm_statuses.items():
+            if key in DM_STATUS_SLOTS and status in DM_STATUS_CODES:
+                entry.set_dm_status(key, status)
+        return entry
+
+class IntroducedSet:
+    """Introduced member IDs as a sorted array of uint64 - 8 bytes per member, bisect lookups
+
+    When loaded from a binary sidecar the array is a read-only view of the memory-mapped file,
+    so guilds that only get looked up never copy it; the first change copies it into memory.
+    """
+
+    __slots__ = ('ids', 'mapped')
+
+    def __init__(self, user_ids=()):
+        self.ids = array('Q', sorted(set(user_ids)))
+        self.mapped = None  # mmap backing self.ids while it is still a read-only view
+
+    @classmethod
+    def from_file(cls, filename):
+        """Load a sidecar written by to_file (sorted little-endian uint64s)"""
+        introduced_members = cls()
+        with open(filename, 'rb') as f:
+            if os.path.getsize(filename) == 0:
+                return introduced_members
+            if os.name == 'nt' or sys.byteorder != 'little':
+                # Windows can't replace a mapped file, and big-endian needs a byteswapped copy anyway
+                introduced_members.ids.frombytes(f.read())
+                if sys.byteorder != 'little':
+                    introduced_members.ids.byteswap()
+                return introduced_members
+            introduced_members.mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        introduced_members.ids = memoryview(introduced_members.mapped).cast('Q')
+        return introduced_members
+
+    @staticmethod
+    def to_file(filename, ids):
+        """Write an array of sorted IDs as a sidecar, atomically"""
+        if sys.byteorder != 'little':
+            ids = array('Q', ids)
+            ids.byteswap()
+        temp_filename = f'{filename}.tmp'
+        with open(temp_filename, 'wb') as f:
+            ids.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filename, filename)
+
+    def make_writable(self):
+        """Copy a memory-mapped view into an owned array before changing it"""
+        if self.mapped is not None:
+            ids = array('Q')
+            ids.frombytes(memoryview(self.ids).cast('B'))
+            self.ids.release()
+            self.mapped.close()
+            self.ids, self.mapped = ids, None
+
+    def __contains__(self, user_id):
+        i = bisect_left(self.ids, user_id)
+        return i < len(self.ids) and self.ids[i] == user_id
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, user_id):
+        i = bisect_left(self.ids, user_id)
+        if i == len(self.ids) or self.ids[i] != user_id:
+            self.make_writable()
+            self.ids.insert(i, user_id)
+
+    def update(self, user_ids):
+        """Add many IDs in one sorted merge (instead of an O(n) insert each), returning the new IDs"""
+        added = sorted({user_id for user_id in user_ids if user_id not in self})
+        if added:
+            self.make_writable()
+            ids = array('Q')
+            start = 0
+            for user_id in added:
+                # Copy the run of existing IDs before each new one as a slice (no per-ID Python work)
+                i = bisect_left(self.ids, user_id, start)
+                ids += self.ids[start:i]
+                ids.append(user_id)
+                start = i
+            ids += self.ids[start:]
+            self.ids = ids
+        return added
+
+    def discard(self, user_id):
+        i = bisect_left(self.ids, user_id)
+        if i < len(self.ids) and self.ids[i] == user_id:
+            self.make_writable()
+            del self.ids[i]
+
+    def clear(self):
+        self.make_writable()
+        self.ids = array('Q')
+
+    def intersection_size(self, user_ids):
+        """Count how many of the given IDs are in the set"""
+        return sum(1 for user_id in user_ids if user_id in self)
+
+    def retain(self, user_ids):
+        """Drop every ID not in user_ids (a set) in one pass, returning the dropped IDs"""
+        removed = [user_id for user_id in self.ids if user_id not in user_ids]
+        if removed:
+            self.make_writable()
+            self.ids = array('Q', (user_id for user_id in self.ids if user_id in user_ids))
+        return removed
+
+    def difference_update(self, user_ids):
+        """Drop every ID in user_ids (a set) in one pass, returning the dropped IDs"""
+        removed = [user_id for user_id in self.ids if user_id in user_ids]
+        if removed:
+            self.make_writable()
+            self.ids = array('Q', (user_id for user_id in self.ids if user_id not in user_ids))
+        return removed
+
+    def copy_ids(self):
+        """Get a sorted array copy of the IDs (for writing off the event loop)"""
+        ids = array('Q')
+        ids.frombytes(memoryview(self.ids).cast('B'))
+        return ids
+
+class JsonStorage:
+    """Per-guild file storage - each guild gets its own config/pending/introduced/state JSON files
+
+    Pending changes are appended to pending_<guild>.journal (one JSON line per changed member)
+    and replayed over the pending_<guild>.json snapshot on load. Once the journal outgrows the
+    snapshot, a compaction writes a fresh snapshot atomically and empties the journal.
+    """
+
+    row_level_kinds = {'pending'}  # Introduced/config/state saves rewrite the whole file
+
+    def __init__(self, read_only=False):
+        self.read_only = read_only  # Leave the files exactly as found (e.g. when migrating them)
+        self.journal_lengths = {}  # {guild_id: lines in the journal}
+        self.snapshot_sizes = {}  # {guild_id: entries in the last snapshot}
+
+    def load_config(self, guild_id):
+        filename = get_guild_file(guild_id, 'config')
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                return json.load(f)
+        return get_default_config()
+
+    def save_config(self, guild_id, config):
+        write_json_file(get_guild_file(guild_id, 'config'), config, indent=2)
+
+    def load_pending(self, guild_id):
+        guild_id = str(guild_id)
+        pending_members = {}
+        filename = get_guild_file(guild_id, 'pending')
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                data = json.load(f)
+                pending_members = {int(user_id): PendingEntry.from_record(value) for user_id, value in data.items()}
+        self.snapshot_sizes[guild_id] = len(pending_members)
+
+        # Replay changes made since the snapshot was written
+        journal_length = 0
+        journal_filename = get_journal_file(guild_id)
+        if os.path.exists(journal_filename):
+            valid_bytes = 0
+            with open(journal_filename, 'rb') as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("missing newline")
+                        change = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a crash mid-append - everything before it is intact
+                        storage_logger.warning("Dropping incomplete line at end of pending journal", extra=log_fields('journal_torn_line', guild_id))
+                        break
+                    valid_bytes += len(line)
+                    journal_length += 1
+                    if change['op'] == 'upsert':
+                        pending_members[int(change['user_id'])] = PendingEntry.from_record(change['entry'])
+                    else:
+                        pending_members.pop(int(change['user_id']), None)
+            # Cut off a torn line so new appends don't get glued onto it
+            if not self.read_only and valid_bytes < os.path.getsize(journal_filename):
+                os.truncate(journal_filename, valid_bytes)
+        self.journal_lengths[guild_id] = journal_length
+        return pending_members
+
+    def save_pending(self, guild_id, pending_members):
+        """Write {user_id: record} as a new snapshot"""
+        # Full snapshot - the journal is only emptied once the new snapshot is safely in place
+        guild_id = str(guild_id)
+        write_json_file(get_guild_file(guild_id, 'pending'), pending_members)
+        if os.path.exists(get_journal_file(guild_id)):
+            os.remove(get_journal_file(guild_id))
+        self.snapshot_sizes[guild_id] = len(pending_members)
+        self.journal_lengths[guild_id] = 0
+
+    def update_pending(self, guild_id, changes):
+        """Append {user_id: (record or None, reason)} to the guild's journal - None means untracked"""
+        guild_id = str(guild_id)
+        lines = []
+        for user_id, (record, reason) in changes.items():
+            if record is None:
+                lines.append(json.dumps({'op': 'delete', 'user_id': user_id, 'reason': reason}))
+            else:
+                lines.append(json.dumps({'op': 'upsert', 'user_id': user_id, 'entry': record, 'reason': reason}))
+        with open(get_journal_file(guild_id), 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_lengths[guild_id] = self.journal_lengths.get(guild_id, 0) + len(lines)
+
+    def needs_compaction(self, guild_id):
+        """Compact once the journal is longer than the snapshot it applies to"""
+        guild_id = str(guild_id)
+        return self.journal_lengths.get(guild_id, 0) > max(JOURNAL_COMPACT_MIN_ENTRIES, self.snapshot_sizes.get(guild_id, 0))
+
+    def load_introduced(self, guild_id):
+        if os.path.exists(get_introduced_sidecar(guild_id)):
+            return IntroducedSet.from_file(get_introduced_sidecar(guild_id))
+        # Older installs only have the JSON list - the sidecar is written on the next save
+        filename = get_guild_file(guild_id, 'introduced')
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                return IntroducedSet(json.load(f))
+        return IntroducedSet()
+
+    def save_introduced(self, guild_id, introduced_ids):
+        IntroducedSet.to_file(get_introduced_sidecar(guild_id), introduced_ids)
+
+    def load_state(self, guild_id):
+        filename = get_guild_file(guild_id, 'state')
+        if os.path.exists(filename):
+            with open(filename, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def save_state(self, guild_id, state):
+        write_json_file(get_guild_file(guild_id, 'state'), state)
+
+class SqliteStorage:
+    """Embedded SQLite storage - one WAL-mode database for all guilds, with row-level upserts/deletes"""
+
+    row_level_kinds = {'pending', 'introduced'}  # update_pending/update_introduced write only the changed rows
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS guild_config (
+            guild_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS pending_members (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            deadline_ts REAL NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS pending_members_by_deadline ON pending_members (guild_id, deadline_ts);
+        CREATE TABLE IF NOT EXISTS introduced_members (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS guild_state (
+            guild_id INTEGER PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        # Writes run in worker threads and share one connection behind a lock. Loads run on the
+        # event loop with their own connection - WAL readers see the last commit without waiting
+        # for a write in progress, so a big save never stalls the loop.
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+        self.read_conn = sqlite3.connect(path, check_same_thread=False)
+
+    @staticmethod
+    def pending_row(guild_id, user_id, record):
+        """Build a pending_members row (deadline_ts is indexed so due members can be queried directly)"""
+        join_ts, deadline_ts = record[0], record[1]
+        return (int(guild_id), int(user_id), deadline_ts or join_ts + GRACE_PERIOD_HOURS * 3600, json.dumps(record))
+
+    def load_config(self, guild_id):
+        row = self.read_conn.execute('SELECT data FROM guild_config WHERE guild_id = ?', (int(guild_id),)).fetchone()
+        return json.loads(row[0]) if row else get_default_config()
+
+    def save_config(self, guild_id, config):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO guild_config (guild_id, data) VALUES (?, ?) '
+                'ON CONFLICT (guild_id) DO UPDATE SET data = excluded.data',
+                (int(guild_id), json.dumps(config))
+            )
+
+    def load_pending(self, guild_id):
+        rows = self.read_conn.execute('SELECT user_id, data FROM pending_members WHERE guild_id = ?', (int(guild_id),)).fetchall()
+        return {user_id: PendingEntry.from_record(json.loads(data)) for user_id, data in rows}
+
+    def save_pending(self, guild_id, pending_members):
+        rows = [self.pending_row(guild_id, user_id, record) for user_id, record in pending_members.items()]
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM pending_members WHERE guild_id = ?', (int(guild_id),))
+            self.conn.executemany('INSERT INTO pending_members VALUES (?, ?, ?, ?)', rows)
+
+    def update_pending(self, guild_id, changes):
+        """Apply {user_id: (record or None, reason)} - None deletes the row"""
+        upserts = [self.pending_row(guild_id, user_id, record) for user_id, (record, _) in changes.items() if record is not None]
+        deletes = [(int(guild_id), int(user_id)) for user_id, (record, _) in changes.items() if record is None]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO pending_members VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (guild_id, user_id) DO UPDATE SET deadline_ts = excluded.deadline_ts, data = excluded.data',
+                upserts
+            )
+            self.conn.executemany('DELETE FROM pending_members WHERE guild_id = ? AND user_id = ?', deletes)
+
+    def needs_compaction(self, guild_id):
+        return False  # SQLite keeps its own write-ahead log
+
+    def load_introduced(self, guild_id):
+        rows = self.read_conn.execute('SELECT user_id FROM introduced_members WHERE guild_id = ?', (int(guild_id),)).fetchall()
+        return IntroducedSet(user_id for (user_id,) in rows)
+
+    def save_introduced(self, guild_id, introduced_members):
+        with self.lock, self.conn:
+            self.conn.execute('DELETE FROM introduced_members WHERE guild_id = ?', (int(guild_id),))
+            self.conn.executemany('INSERT INTO introduced_members VALUES (?, ?)', [(int(guild_id), user_id) for user_id in introduced_members])
+
+    def update_introduced(self, guild_id, changes):
+        """Apply {user_id: is_introduced} - False deletes the row"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO introduced_members VALUES (?, ?)',
+                [(int(guild_id), user_id) for user_id, present in changes.items() if present]
+            )
+            self.conn.executemany(
+                'DELETE FROM introduced_members WHERE guild_id = ? AND user_id = ?',
+                [(int(guild_id), user_id) for user_id, present in changes.items() if not present]
+            )
+
+    def load_state(self, guild_id):
+        row = self.read_conn.execute('SELECT data FROM guild_state WHERE guild_id = ?', (int(guild_id),)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def save_state(self, guild_id, state):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO guild_state (guild_id, data) VALUES (?, ?) '
+                'ON CONFLICT (guild_id) DO UPDATE SET data = excluded.data',
+                (int(guild_id), json.dumps(state))
+            )
+
+def create_storage():
+    """Create the storage backend selected by STORAGE_BACKEND"""
+    if STORAGE_BACKEND == 'sqlite':
+        return SqliteStorage(SQLITE_DATABASE)
+    if STORAGE_BACKEND != 'json':
+        raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r} (expected 'json' or 'sqlite')")
+    return JsonStorage()
+
+storage = create_storage()
+
+# Intro channel index - lets on_message drop messages outside intro channels with one lookup,
+# before any guild data is loaded. Kept current by every config load/save.
+intro_channel_guilds = {}  # {intro_channel_id: guild_id}
+guild_intro_channels = {}  # {guild_id: intro_channel_id}
+
+def index_intro_channel(guild_id, config):
+    """Record a guild's intro channel in the index, replacing its previous one"""
+    guild_id = str(guild_id)
+    intro_channel_guilds.pop(guild_intro_channels.pop(guild_id, 0), None)
+    intro_channel_id = config.get('intro_channel_id', 0)
+    if intro_channel_id:
+        intro_channel_guilds[intro_channel_id] = guild_id
+        guild_intro_channels[guild_id] = intro_channel_id
+
+# Intro validation - each guild's rules (config 'intro_rules', falling back to MIN_INTRO_LENGTH,
+# REQUIRE_KEYWORDS and KEYWORD_WHOLE_WORDS) are compiled once into a single regex, so checking
+# an intro is one pass over its content however many keywords there are. Cached per guild and
+# dropped whenever the config is loaded or saved.
+class IntroRules:
+    """Compiled intro requirements for one guild"""
+
+    __slots__ = ('min_length', 'keywords', 'whole_words', 'pattern', 'implied')
+
+    def __init__(self, min_length=0, keywords=(), whole_words=False):
+        self.min_length = min_length
+        self.keywords = list(dict.fromkeys(keyword.lower() for keyword in keywords if keyword.strip()))
+        self.whole_words = whole_words
+        self.pattern = None
+        self.implied = {}  # {keyword: shorter keywords it starts with, which a match also satisfies}
+        if self.keywords:
+            # Longest first, inside a lookahead so a match is tried at every position
+            alternation = '|'.join(re.escape(keyword) for keyword in sorted(self.keywords, key=len, reverse=True))
+            if whole_words:
+                alternation = rf'(?<!\w)(?:{alternation})(?!\w)'
+            self.pattern = re.compile(rf'(?=({alternation}))', re.IGNORECASE)
+            for keyword in self.keywords:
+                self.implied[keyword] = [
+                    prefix for prefix in self.keywords
+                    if prefix != keyword and keyword.startswith(prefix)
+                    and (not whole_words or not re.match(r'\w', keyword[len(prefix)]))
+                ]
+
+    @classmethod
+    def from_config(cls, config):
+        rules = config.get('intro_rules', {})
+        return cls(
+            rules.get('min_length', MIN_INTRO_LENGTH),
+            rules.get('keywords', REQUIRE_KEYWORDS),
+            rules.get('whole_words', KEYWORD_WHOLE_WORDS),
+        )
+
+    def find_missing_keywords(self, content):
+        """Get the required keywords the content doesn't contain"""
+        if self.pattern is None:
+            return []
+        missing = set(self.keywords)
+        for match in self.pattern.finditer(content):
+            keyword = match.group(1).lower()
+            missing.discard(keyword)
+            missing.difference_update(self.implied.get(keyword, ()))
+            if not missing:
+                break
+        return [keyword for keyword in self.keywords if keyword in missing]
+
+intro_rules_cache = {}  # {guild_id: IntroRules}
+
+def get_intro_rules(guild_id, config):
+    """Get a guild's compiled intro rules"""
+    rules = intro_rules_cache.get(guild_id)
+    if rules is None:
+        rules = intro_rules_cache[guild_id] = IntroRules.from_config(config)
+    return rules
+
+def load_guild_config(guild_id):
+    """Load configuration for a specific guild"""
+    config = storage.load_config(guild_id)
+    index_intro_channel(guild_id, config)
+    intro_rules_cache.pop(str(guild_id), None)
+    return config
+
 def save_guild_config(guild_id, config):
     """Save configuration for a specific guild"""
-    filename = get_guild_file(guild_id, 'config')
-    with open(filename, 'w') as f:
-        json.dump(config, f, indent=2)
+    storage.save_config(guild_id, config)
+    index_intro_channel(guild_id, config)
+    intro_rules_cache.pop(str(guild_id), None)
 
 def load_guild_pending(guild_id):
     """Load pending members for a specific guild"""
-    filename = get_guild_file(guild_id, 'pending')
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            data = json.load(f)
-            # Migrate old format if needed
-            for user_id, value in data.items():
-                if isinstance(value, str):
-                    data[user_id] = {
-                        'join_time': value,
-                        'reminded_12': False
-                    }
-            return data
-    return {}
+    return storage.load_pending(guild_id)
 
 def save_guild_pending(guild_id, pending_members):
     """Save pending members for a specific guild"""
-    filename = get_guild_file(guild_id, 'pending')
-    with open(filename, 'w') as f:
-        json.dump(pending_members, f, indent=2)
+    storage.save_pending(guild_id, pending_members)
 
 def load_guild_introduced(guild_id):
     """Load introduced members for a specific guild"""
-    filename = get_guild_file(guild_id, 'introduced')
-    if os.path.exists(filename):
-        with open(filename, 'r') as f:
-            return set(json.load(f))
-    return set()
+    return storage.load_introduced(guild_id)
 
 def save_guild_introduced(guild_id, introduced_members):
     """Save introduced members for a specific guild"""
-    filename = get_guild_file(guild_id, 'introduced')
-    with open(filename, 'w') as f:
-        json.dump(list(introduced_members), f, indent=2)
-
-# Guild-specific data will be loaded on-demand when needed
-guild_data_cache = {}  # {guild_id: {'config': {}, 'pending': {}, 'introduced': set()}}
+    storage.save_introduced(guild_id, introduced_members)
+
+def load_guild_state(guild_id):
+    """Load bot bookkeeping (scan checkpoints etc.) for a specific guild"""
+    return storage.load_state(guild_id)
+
+def save_guild_state(guild_id, state):
+    """Save bot bookkeeping for a specific guild"""
+    storage.save_state(guild_id, state)
+
+def migrate_json_to_sqlite(database=None):
+    """One-shot import of config_*/pending_*/introduced_*/state_*.json (plus introduced_*.bin and pending_*.journal) files into the SQLite database"""
+    json_storage = JsonStorage(read_only=True)
+    sqlite_storage = SqliteStorage(database or SQLITE_DATABASE)
+
+    guild_ids = set()
+    for filename in os.listdir('.'):
+        for file_type in ('config', 'pending', 'introduced', 'state'):
+            prefix = f'{file_type}_'
+            name, extension = os.path.splitext(filename)
+            # A guild's pending data may so far only exist as a journal (never compacted)
+            if name.startswith(prefix) and extension in ('.json', '.bin', '.journal') and name[len(prefix):].isdigit():
+                guild_ids.add(name[len(prefix):])
+
+    for guild_id in sorted(guild_ids):
+        config = json_storage.load_config(guild_id)
+        pending_members = json_storage.load_pending(guild_id)
+        introduced_members = json_storage.load_introduced(guild_id)
+        sqlite_storage.save_config(guild_id, config)
+        sqlite_storage.save_pending(guild_id, snapshot_pending(pending_members))
+        sqlite_storage.save_introduced(guild_id, introduced_members)
+        sqlite_storage.save_state(guild_id, json_storage.load_state(guild_id))
+        print(f"Guild {guild_id}: Imported {len(pending_members)} pending and {len(introduced_members)} introduced members")
+
+    print(f"Migrated {len(guild_ids)} guild(s) into {database or SQLITE_DATABASE}")
+    print("Set STORAGE_BACKEND = 'sqlite' to use it. The JSON files were left in place as a backup.")
+
+# Guild-specific data will be loaded on-demand when needed. At most GUILD_CACHE_MAX_GUILDS are
+# kept; the least recently used idle guilds are dropped once their changes are on disk and are
+# reloaded on their next event. Guilds with unsaved changes, a member due within
+# GUILD_CACHE_PIN_MINUTES, a running scan/backfill or an active holder are never dropped.
+guild_data_cache = OrderedDict()  # {guild_id: {'config': {}, 'pending': {}, 'introduced': IntroducedSet, 'state': {}}}, oldest first
+guild_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+guild_data_holds = {}  # {guild_id: number of tasks holding references to the guild's data}
 
 def get_guild_data(guild_id):
     """Get all data for a guild (loads from file if not cached)"""
     guild_id_str = str(guild_id)
-    if guild_id_str not in guild_data_cache:
-        guild_data_cache[guild_id_str] = {
-            'config': load_guild_config(guild_id_str),
-            'pending': load_guild_pending(guild_id_str),
-            'introduced': load_guild_introduced(guild_id_str)
-        }
+    if guild_id_str in guild_data_cache:
+        guild_cache_stats['hits'] += 1
+        guild_data_cache.move_to_end(guild_id_str)
+        return guild_data_cache[guild_id_str]
+
+    if not owns_guild(guild_id_str):
+        # Another process writes this guild's files - loading (and later saving) them here would clobber its changes
+        raise RuntimeError(f"Guild {guild_id_str} belongs to shard {get_guild_shard(guild_id_str)}, not shard {SHARD_ID}")
+
+    guild_cache_stats['misses'] += 1
+    guild_data_cache[guild_id_str] = {
+        'config': load_guild_config(guild_id_str),
+        'pending': load_guild_pending(guild_id_str),
+        'introduced': load_guild_introduced(guild_id_str),
+        'state': load_guild_state(guild_id_str)
+    }
+    # Members already in the schedule (the guild was evicted, not new) keep their due times
+    schedule_guild_pending(guild_id_str, guild_data_cache[guild_id_str]['pending'], keep_scheduled=True)
+    evict_idle_guilds()
     return guild_data_cache[guild_id_str]
 
+@contextmanager
+def hold_guild_data(guild_id):
+    """Keep a guild's data cached while a task holds references to it across awaits"""
+    guild_id = str(guild_id)
+    guild_data_holds[guild_id] = guild_data_holds.get(guild_id, 0) + 1
+    try:
+        yield get_guild_data(guild_id)
+    finally:
+        guild_data_holds[guild_id] -= 1
+        if not guild_data_holds[guild_id]:
+            del guild_data_holds[guild_id]
+
+def is_guild_data_pinned(guild_id):
+    """Check whether a cached guild must stay loaded"""
+    if guild_id in dirty_guilds or guild_id in flushing_guilds or guild_id in guild_data_holds:
+        return True
+    if guild_id in warming_guilds or guild_id in reaction_backfill_guilds or guild_id in role_backfill_guilds:
+        return True
+    if guild_id in history_scan_progress:
+        return True
+    next_due = get_guild_next_due(guild_id)
+    return next_due is not None and next_due < time.time() + GUILD_CACHE_PIN_MINUTES * 60
+
+def evict_idle_guilds():
+    """Drop least recently used idle guilds until the cache is within GUILD_CACHE_MAX_GUILDS"""
+    excess = len(guild_data_cache) - GUILD_CACHE_MAX_GUILDS
+    if excess <= 0:
+        return
+    # The most recently used guild is the one being loaded right now
+    for guild_id in list(guild_data_cache)[:-1]:
+        if excess <= 0:
+            break
+        if is_guild_data_pinned(guild_id):
+            continue
+        del guild_data_cache[guild_id]
+        guild_cache_stats['evictions'] += 1
+        excess -= 1
+
+# Member lookups - in lazy mode a cache miss doesn't mean a member left, so members missing
+# from the cache are looked up over the gateway (query_members, 100 IDs per request)
+MEMBER_QUERY_BATCH_SIZE = 100  # Discord's limit for one query_members request
+
+async def resolve_members(guild, user_ids):
+    """Find members by ID, querying the gateway for any that aren't cached
+
+    Returns (found, departed): {user_id: Member} and the IDs confirmed not to be in the guild.
+    IDs whose lookup failed are in neither, so callers can retry them later.
+    """
+    found = {}
+    missing = []
+    for user_id in user_ids:
+        member = guild.get_member(user_id)
+        if member is not None:
+            found[user_id] = member
+        else:
+            missing.append(user_id)
+    if not missing or guild.chunked:
+        return found, set(missing)  # Complete cache - a miss means they left
+
+    departed = set()
+    for start in range(0, len(missing), MEMBER_QUERY_BATCH_SIZE):
+        batch = missing[start:start + MEMBER_QUERY_BATCH_SIZE]
+        try:
+            with observe_duration('allo_discord_api_seconds', call='query_members'):
+                members = await guild.query_members(user_ids=batch, limit=MEMBER_QUERY_BATCH_SIZE, cache=True)
+        except asyncio.TimeoutError:
+            member_logger.warning("Timed out looking up %d members", len(batch), extra=log_fields('member_query_timeout', guild.id))
+            continue
+        for member in members:
+            found[member.id] = member
+        departed.update(user_id for user_id in batch if user_id not in found)
+    return found, departed
+
+async def ensure_member_cache(guild):
+    """Load a guild's full member list in lazy mode (for commands that need every member)"""
+    if MEMBER_CACHE_MODE == 'lazy' and not guild.chunked:
+        started_at = time.perf_counter()
+        await guild.chunk()
+        member_logger.info(
+            "Loaded %d members on demand", len(guild.members),
+            extra=log_fields('member_cache_loaded', guild.id, duration=time.perf_counter() - started_at)
+        )
+
+# Untracked members index - non-bot members who are neither introduced nor pending. Built from
+# the member cache the first time !scanexisting/!trackexisting needs it, then kept current by
+# joins, leaves, intros and (un)tracking, so those commands no longer walk every member.
+untracked_members = {}  # {guild_id: {user_id: None}} - a dict so pages keep a stable order
+
+def get_untracked_members(guild):
+    """Get a guild's untracked members, building the index on first use"""
+    guild_id = str(guild.id)
+    untracked = untracked_members.get(guild_id)
+    if untracked is None:
+        guild_data = get_guild_data(guild_id)
+        introduced_members = guild_data['introduced']
+        pending_members = guild_data['pending']
+        untracked = untracked_members[guild_id] = {
+            member.id: None for member in guild.members
+            if not member.bot and member.id not in introduced_members and member.id not in pending_members
+        }
+    return untracked
+
+def mark_untracked(guild_id, user_id):
+    """Add a member to the index (only if it has been built)"""
+    untracked = untracked_members.get(str(guild_id))
+    if untracked is not None:
+        untracked[user_id] = None
+
+def unmark_untracked(guild_id, user_ids):
+    """Remove members who joined tracking, introduced themselves or left"""
+    untracked = untracked_members.get(str(guild_id))
+    if untracked is not None:
+        for user_id in user_ids:
+            untracked.pop(user_id, None)
+
+# Member counters behind !stats - humans and introduced-and-present per guild, counted once
+# from the member cache and then adjusted by joins, leaves and intros. The reconciler recounts
+# every STATS_RECONCILE_MINUTES in slices (yielding to the loop) and corrects any drift.
+member_counts = {}  # {guild_id: {'humans': int, 'introduced': int}}
+member_counts_task = None
+RECOUNT_SLICE_SIZE = 5000  # Members counted between yields to the event loop
+
+def get_member_counts(guild):
+    """Get a guild's member counters, counting the member cache on first use"""
+    global member_counts_task
+    guild_id = str(guild.id)
+    counts = member_counts.get(guild_id)
+    if counts is None:
+        introduced_members = get_guild_data(guild_id)['introduced']
+        humans = [member.id for member in guild.members if not member.bot]
+        counts = member_counts[guild_id] = {'humans': len(humans), 'introduced': introduced_members.intersection_size(humans)}
+        if member_counts_task is None or member_counts_task.done():
+            member_counts_task = asyncio.get_running_loop().create_task(reconcile_member_counts_loop())
+    return counts
+
+def adjust_member_counts(guild_id, humans=0, introduced=0):
+    """Apply a join/leave/intro to a guild's counters (no-op until they've been counted)"""
+    counts = member_counts.get(str(guild_id))
+    if counts is not None:
+        counts['humans'] += humans
+        counts['introduced'] += introduced
+
+async def recount_members(guild):
+    """Recount a guild's counters without blocking the loop, keeping events seen meanwhile"""
+    guild_id = str(guild.id)
+    counts = member_counts.get(guild_id)
+    if counts is None:
+        return
+    before = dict(counts)
+    members = list(guild.members)  # Snapshot - events from here on are already in counts
+    humans = introduced = 0
+    for start in range(0, len(members), RECOUNT_SLICE_SIZE):
+        introduced_members = get_guild_data(guild_id)['introduced']
+        ids = [member.id for member in members[start:start + RECOUNT_SLICE_SIZE] if not member.bot]
+        humans += len(ids)
+        introduced += introduced_members.intersection_size(ids)
+        await asyncio.sleep(0)
+
+    if member_counts.get(guild_id) is not counts:
+        return  # Dropped (e.g. !resetcache) while recounting
+    # Counts now = recount + whatever events changed them since the snapshot
+    drift = (humans - before['humans'], introduced - before['introduced'])
+    counts['humans'] += drift[0]
+    counts['introduced'] += drift[1]
+    if drift != (0, 0):
+        member_logger.info(
+            "Corrected member counter drift (humans %+d, introduced %+d)", *drift,
+            extra=log_fields('member_counts_reconciled', guild_id, humans_drift=drift[0], introduced_drift=drift[1])
+        )
+
+async def reconcile_member_counts_loop():
+    """Recount every counted guild each STATS_RECONCILE_MINUTES"""
+    while member_counts:
+        await asyncio.sleep(STATS_RECONCILE_MINUTES * 60)
+        for guild_id in list(member_counts):
+            guild = bot.get_guild(int(guild_id))
+            if guild is None:
+                member_counts.pop(guild_id, None)  # Bot left the server
+                continue
+            await recount_members(guild)
+
+# Write-behind persistence - changes mark a guild dirty and the writer task flushes it
+# after SAVE_DEBOUNCE_SECONDS of quiet (or SAVE_MAX_DELAY_SECONDS at most), so a join
+# wave turns hundreds of full-file rewrites into a handful. Where the backend supports it
+# only the changed user IDs are written; a kind dirtied without keys is rewritten in full.
+dirty_guilds = {}  # {guild_id: {'kinds': {kind: {user_id: reason} or None}, 'first_dirty': monotonic, 'last_dirty': monotonic}}
+persistence_stats = {'save_requests': 0, 'coalesced': 0, 'writes': 0, 'write_errors': 0, 'compactions': 0}
+write_behind_wakeup = asyncio.Event()
+write_behind_task = None
+flushing_guilds = set()  # Guilds with a write in progress (no longer in dirty_guilds, not yet on disk)
+flush_lock = asyncio.Lock()  # Held by the flush that is writing
+
+def snapshot_pending(pending_members, changes=None):
+    """Convert pending entries to stored records so they can be written off the event loop"""
+    if changes is None:
+        return {user_id: entry.to_record() for user_id, entry in pending_members.items()}
+    # Row-level changes - None marks a removed entry
+    return {
+        user_id: (pending_members[user_id].to_record() if user_id in pending_members else None, reason)
+        for user_id, reason in changes.items()
+    }
+
+def snapshot_state(state):
+    """Copy guild state, including the lists and dicts (e.g. the reaction backlog, the role backfill job) the loop keeps changing"""
+    if isinstance(state, dict):
+        return {key: snapshot_state(value) for key, value in state.items()}
+    if isinstance(state, list):
+        return list(state)  # Entries (IDs, [channel_id, message_id] pairs) are never changed in place
+    return state
+
+def snapshot_introduced(introduced_members, changes=None):
+    """Copy introduced data for the writer thread"""
+    if changes is None:
+        return introduced_members.copy_ids()
+    return {user_id: user_id in introduced_members for user_id in changes}
+
+# {kind: (snapshot function run on the loop, full save, row-level update)} - saves run in a worker thread
+GUILD_DATA_WRITERS = {
+    'pending': (snapshot_pending, save_guild_pending, lambda guild_id, changes: storage.update_pending(guild_id, changes)),
+    'introduced': (snapshot_introduced, save_guild_introduced, lambda guild_id, changes: storage.update_introduced(guild_id, changes)),
+    'state': (lambda state, changes=None: snapshot_state(state), save_guild_state, None),  # Small - always saved whole
+}
+
+def mark_guild_dirty(guild_id, kind, user_ids=None, reason=None):
+    """Queue a write of a guild's pending, introduced or state data, coalescing it with other queued changes
+
+    user_ids lists the changed entries (int user IDs); leave it
+    out when the whole set changed. reason labels pending changes in the journal ('joined',
+    'reminded', 'introduced', 'kicked', ...).
+    """
+    global write_behind_task
+    guild_id = str(guild_id)
+    now = time.monotonic()
+    persistence_stats['save_requests'] += 1
+
+    dirty = dirty_guilds.get(guild_id)
+    if dirty is None:
+        dirty = dirty_guilds[guild_id] = {'kinds': {}, 'first_dirty': now, 'last_dirty': now}
+    if kind in dirty['kinds']:
+        persistence_stats['coalesced'] += 1
+        if user_ids is None or dirty['kinds'][kind] is None:
+            dirty['kinds'][kind] = None
+        else:
+            dirty['kinds'][kind].update(dict.fromkeys(user_ids, reason))
+    else:
+        dirty['kinds'][kind] = None if user_ids is None else dict.fromkeys(user_ids, reason)
+    dirty['last_dirty'] = now
+
+    if write_behind_task is None or write_behind_task.done():
+        write_behind_task = asyncio.get_running_loop().create_task(write_behind_loop())
+    write_behind_wakeup.set()
+
+def get_flush_time(dirty):
+    """Get when a dirty guild should be written (debounce, capped by the max delay)"""
+    return min(dirty['last_dirty'] + SAVE_DEBOUNCE_SECONDS, dirty['first_dirty'] + SAVE_MAX_DELAY_SECONDS)
+
+async def write_behind_loop():
+    """Background writer - flushes dirty guilds as their debounce/max-delay timers expire"""
+    while True:
+        write_behind_wakeup.clear()
+        if not dirty_guilds:
+            await write_behind_wakeup.wait()
+            continue
+
+        now = time.monotonic()
+        next_flush = min(get_flush_time(dirty) for dirty in dirty_guilds.values())
+        if next_flush > now:
+            try:
+                await asyncio.wait_for(write_behind_wakeup.wait(), timeout=next_flush - now)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        await flush_dirty_guilds(now)
+        # Flushed guilds may now be dropped from the cache
+        evict_idle_guilds()
+
+async def flush_dirty_guilds(now=None):
+    """Write dirty guilds whose timers have expired (every dirty guild if now is None)
+
+    Flushes run one at a time, so a shutdown flush waits for the write-behind loop's current
+    write instead of writing the same files from a second thread.
+    """
+    async with flush_lock:
+        for guild_id in list(dirty_guilds):
+            dirty = dirty_guilds[guild_id]
+            if now is not None and get_flush_time(dirty) > now:
+                continue
+            del dirty_guilds[guild_id]
+
+            guild_data = guild_data_cache.get(guild_id)
+            if guild_data is None:
+                # Changed through a reference held past the guild's eviction - hold_guild_data prevents this
+                persistence_stats['write_errors'] += 1
+                storage_logger.error(
+                    "Dropping %s changes for a guild that is no longer cached", ', '.join(sorted(dirty['kinds'])),
+                    extra=log_fields('save_dropped', guild_id, kinds=sorted(dirty['kinds']))
+                )
+                continue
+
+            flushing_guilds.add(guild_id)
+            try:
+                await write_guild_changes(guild_id, guild_data, dirty)
+            finally:
+                flushing_guilds.discard(guild_id)
+
+async def write_guild_changes(guild_id, guild_data, dirty):
+    """Write one guild's dirty kinds - failed kinds are queued again as full saves"""
+    for kind, changes in sorted(dirty['kinds'].items()):
+        snapshot_fn, save_fn, update_fn = GUILD_DATA_WRITERS[kind]
+        row_level = changes is not None and kind in storage.row_level_kinds
+        compaction_snapshot = None
+        if row_level:
+            write_fn, snapshot = update_fn, snapshot_fn(guild_data[kind], changes)
+            # Background compaction - fold a long pending journal into a fresh snapshot. The
+            # snapshot is taken together with the journaled rows, so it holds exactly what the
+            # journal will hold and replaying the journal over it (after a crash between
+            # writing the snapshot and removing the journal) gives the same entries.
+            if kind == 'pending' and storage.needs_compaction(guild_id):
+                compaction_snapshot = snapshot_fn(guild_data[kind])
+        else:
+            write_fn, snapshot = save_fn, snapshot_fn(guild_data[kind])
+        try:
+            with observe_duration('allo_persistence_seconds', kind=kind):
+                await asyncio.to_thread(write_fn, guild_id, snapshot)
+            persistence_stats['writes'] += 1
+
+            if compaction_snapshot is not None:
+                with observe_duration('allo_persistence_seconds', kind=f'{kind}_compaction'):
+                    await asyncio.to_thread(save_fn, guild_id, compaction_snapshot)
+                persistence_stats['compactions'] += 1
+        except Exception as e:
+            persistence_stats['write_errors'] += 1
+            storage_logger.error("Failed to save %s data, will retry: %s", kind, e, extra=log_fields('save_failed', guild_id, kind=kind))
+            # Retry as a full save - the failed rows may have been only partly applied
+            retry = dirty_guilds.setdefault(guild_id, {'kinds': {}, 'first_dirty': time.monotonic(), 'last_dirty': time.monotonic()})
+            retry['kinds'][kind] = None
+
+# Deadline-ordered scheduler - pending members are keyed by their next due event
+# (next reminder tier, 24h-remaining reminder or kick deadline) so the check loop
+# only wakes up for, and only touches, members that actually have something due.
+pending_schedule = []  # heap of (due_timestamp, guild_id, user_id)
+pending_schedule_due = {}  # {(guild_id, user_id): due_timestamp} - stale heap items are skipped
+guild_schedules = {}  # {guild_id: heap of (due_timestamp, user_id)} - per-guild view, for cache pinning
+schedule_wakeup = asyncio.Event()
+
+def get_next_due_time(entry, grace_hours=GRACE_PERIOD_HOURS):
+    """Get the epoch time of the next reminder, 24h-remaining reminder or kick for a pending entry"""
+    deadline_ts = entry.get_deadline(grace_hours)
+
+    due = deadline_ts
+    for i, reminder_hour in enumerate(REMINDER_TIMES):
+        if not entry.reminded & get_reminder_bit(i):
+            due = min(due, entry.join_ts + reminder_hour * 3600)
+
+    # Members with a custom deadline longer than the normal grace period get an extra 24h reminder
+    if entry.deadline_ts and deadline_ts - entry.join_ts > GRACE_PERIOD_HOURS * 3600:
+        if not entry.reminded & REMINDED_24H_REMAINING:
+            due = min(due, deadline_ts - 24 * 3600)
+
+    return due
+
+def schedule_at(guild_id, user_id, due):
+    """Put a pending member in the schedule at an explicit due time"""
+    key = (str(guild_id), int(user_id))
+    is_earliest = not pending_schedule or due < pending_schedule[0][0]
+    pending_schedule_due[key] = due
+    heapq.heappush(pending_schedule, (due, key[0], key[1]))
+    heapq.heappush(guild_schedules.setdefault(key[0], []), (due, key[1]))
+    if is_earliest:
+        # Wake the check loop so it can shorten its sleep
+        schedule_wakeup.set()
+
+    # Compact the heap when unscheduled/rescheduled leftovers dominate it
+    if len(pending_schedule) > 1024 and len(pending_schedule) > 2 * len(pending_schedule_due):
+        pending_schedule[:] = [(d, g, u) for (g, u), d in pending_schedule_due.items()]
+        heapq.heapify(pending_schedule)
+        guild_schedules.clear()
+        for due, guild_id, user_id in pending_schedule:
+            guild_schedules.setdefault(guild_id, []).append((due, user_id))
+        for heap in guild_schedules.values():
+            heapq.heapify(heap)
+
+def schedule_pending_member(guild_id, user_id, entry, grace_hours=GRACE_PERIOD_HOURS):
+    """Add or move a pending member in the schedule based on their next due event"""
+    schedule_at(guild_id, user_id, get_next_due_time(entry, grace_hours))
+
+def unschedule_pending_member(guild_id, user_id):
+    """Remove a pending member from the schedule (their heap item is skipped when popped)"""
+    pending_schedule_due.pop((str(guild_id), int(user_id)), None)
+
+def schedule_guild_pending(guild_id, pending_members, keep_scheduled=False):
+    """Schedule every pending member of a guild (used when a guild's data is loaded)"""
+    guild_id = str(guild_id)
+    for user_id, entry in pending_members.items():
+        if keep_scheduled and (guild_id, user_id) in pending_schedule_due:
+            continue
+        schedule_pending_member(guild_id, user_id, entry)
+
+def get_guild_next_due(guild_id):
+    """Get the earliest due time among a guild's scheduled members, dropping stale heap items"""
+    heap = guild_schedules.get(guild_id)
+    while heap and pending_schedule_due.get((guild_id, heap[0][1])) != heap[0][0]:
+        heapq.heappop(heap)
+    if not heap:
+        guild_schedules.pop(guild_id, None)
+        return None
+    return heap[0][0]
+
+def peek_next_due():
+    """Get the earliest valid due time in the schedule, dropping stale heap items"""
+    while pending_schedule:
+        due, guild_id, user_id = pending_schedule[0]
+        if pending_schedule_due.get((guild_id, user_id)) == due:
+            return due
+        heapq.heappop(pending_schedule)
+    return None
+
+def pop_due_members(now):
+    """Pop every scheduled member whose due time has passed, grouped by guild"""
+    due_by_guild = {}
+    while True:
+        due = peek_next_due()
+        if due is None or due > now:
+            break
+        _, guild_id, user_id = heapq.heappop(pending_schedule)
+        del pending_schedule_due[(guild_id, user_id)]
+        get_guild_next_due(guild_id)  # Drops the popped item from the guild's heap too
+        due_by_guild.setdefault(guild_id, []).append(user_id)
+    return due_by_guild
+
+async def wait_for_due_members():
+    """Sleep until the earliest scheduled event (or until the schedule gets an earlier one)"""
+    while True:
+        schedule_wakeup.clear()
+        next_due = peek_next_due()
+        timeout = CHECK_INTERVAL_MINUTES * 60 if next_due is None else next_due - time.time()
+        if timeout <= 0:
+            return
+        try:
+            await asyncio.wait_for(schedule_wakeup.wait(), timeout=min(timeout, CHECK_INTERVAL_MINUTES * 60))
+        except asyncio.TimeoutError:
+            pass
+
 def is_member_exempt(member, exempt_role_ids):
     """Check if a member is exempt from intro requirements"""
     if not exempt_role_ids:
@@ -113,110 +1543,708 @@ def get_member_grace_period(member):
         return GRACE_PERIOD_HOURS + BOOSTER_GRACE_HOURS
     return GRACE_PERIOD_HOURS
 
-async def log_to_mod_channel(guild_id, message, color=discord.Color.orange()):
-    """Log a message to the mod log channel if configured"""
+# Mod log batching - events are buffered per guild and sent as multi-line embeds, either
+# once a batch fills an embed or MOD_LOG_FLUSH_SECONDS after its first line
+MOD_LOG_EMBED_LIMIT = 4096  # Discord's embed description limit
+mod_log_buffers = {}  # {guild_id: {'lines': [(message, color)], 'size': int, 'dropped': {kind: count}, 'full': Event, 'task': Task}}
+
+def log_to_mod_channel(guild_id, message, color=discord.Color.orange(), kind='events'):
+    """Queue a message for the mod log channel if configured (never blocks the caller)
+
+    kind names the event type in the overflow summary ("+37 more reminders") when more than
+    MOD_LOG_MAX_BUFFERED_LINES lines are waiting.
+    """
+    guild_id = str(guild_id)
     config = get_guild_data(guild_id)['config']
-    mod_log_channel_id = config.get('mod_log_channel_id', 0)
+    if config.get('mod_log_channel_id', 0) == 0:
+        return
 
-    if mod_log_channel_id == 0:
+    buffer = mod_log_buffers.get(guild_id)
+    if buffer is None:
+        buffer = mod_log_buffers[guild_id] = {'lines': [], 'size': 0, 'dropped': {}, 'full': asyncio.Event(), 'task': None}
+
+    if len(buffer['lines']) >= MOD_LOG_MAX_BUFFERED_LINES:
+        buffer['dropped'][kind] = buffer['dropped'].get(kind, 0) + 1
+    else:
+        buffer['lines'].append((message, color))
+        buffer['size'] += len(message) + 1
+        if buffer['size'] >= MOD_LOG_EMBED_LIMIT:
+            buffer['full'].set()
+
+    if buffer['task'] is None or buffer['task'].done():
+        buffer['task'] = asyncio.get_running_loop().create_task(mod_log_flush_loop(guild_id))
+
+async def mod_log_flush_loop(guild_id):
+    """Send a guild's buffered mod log lines whenever a batch is full or has waited long enough"""
+    buffer = mod_log_buffers[guild_id]
+    while buffer['lines'] or buffer['dropped']:
+        try:
+            await asyncio.wait_for(buffer['full'].wait(), timeout=MOD_LOG_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        await send_mod_log_batch(guild_id)
+
+def build_mod_log_embeds(lines, dropped):
+    """Pack log lines into as few embeds as fit, ending with a summary of dropped lines"""
+    if dropped:
+        summary = ", ".join(f"+{count} more {kind}" for kind, count in dropped.items())
+        lines = lines + [(f"⚠️ {summary} (mod log overflow)", discord.Color.red())]
+
+    embeds = []
+    description = ""
+    color = None
+    for message, line_color in lines:
+        message = message[:MOD_LOG_EMBED_LIMIT]
+        if description and len(description) + len(message) + 1 > MOD_LOG_EMBED_LIMIT:
+            embeds.append(discord.Embed(description=description, color=color, timestamp=datetime.utcnow()))
+            description = ""
+        if not description:
+            color = line_color  # Each embed takes the color of its first line
+            description = message
+        else:
+            description += "\n" + message
+    if description:
+        embeds.append(discord.Embed(description=description, color=color, timestamp=datetime.utcnow()))
+    return embeds
+
+async def send_mod_log_batch(guild_id):
+    """Send everything currently buffered for a guild's mod log"""
+    buffer = mod_log_buffers[guild_id]
+    lines, dropped = buffer['lines'], buffer['dropped']
+    buffer['lines'], buffer['size'], buffer['dropped'] = [], 0, {}
+    buffer['full'].clear()
+    if not lines and not dropped:
+        return
+
+    mod_channel = bot.get_channel(get_guild_data(guild_id)['config'].get('mod_log_channel_id', 0))
+    if not mod_channel:
         return
 
-    mod_channel = bot.get_channel(mod_log_channel_id)
-    if mod_channel:
+    for embed in build_mod_log_embeds(lines, dropped):
         try:
-            embed = discord.Embed(description=message, color=color, timestamp=datetime.utcnow())
-            await mod_channel.send(embed=embed)
+            with observe_duration('allo_discord_api_seconds', call='send_message'):
+                await mod_channel.send(embed=embed)
         except Exception as e:
-            print(f"Failed to log to mod channel: {e}")
+            mod_log_logger.warning("Failed to log to mod channel: %s", e, extra=log_fields('mod_log_failed', guild_id))
+
+async def flush_mod_logs():
+    """Send every guild's buffered mod log lines now (used on shutdown)"""
+    for guild_id in list(mod_log_buffers):
+        await send_mod_log_batch(guild_id)
+
+# History scans in progress, {guild_id: {'messages': count, 'started': perf_counter}}
+history_scan_progress = {}
 
 async def scan_intro_channel_history(guild_id, intro_channel_id):
-    """Scan intro channel history to build/update the introduced members cache"""
+    """Scan intro channel history to build/update the introduced members cache
+
+    Messages newer than the guild's last scanned message are fetched first. The first scan of
+    an intro channel then pages backwards through its whole history with before= cursors,
+    checkpointing the cursor every SCAN_CHECKPOINT_PAGES pages so a restart carries on where it stopped.
+    """
     if intro_channel_id == 0:
-        print(f"Guild {guild_id}: Intro channel not set, skipping scan")
+        scan_logger.info("Intro channel not set, skipping scan", extra=log_fields('scan_skipped', guild_id))
         return
 
     intro_channel = bot.get_channel(intro_channel_id)
     if not intro_channel:
-        print(f"Guild {guild_id}: Could not find intro channel {intro_channel_id}")
+        scan_logger.warning("Could not find intro channel %d", intro_channel_id, extra=log_fields('scan_skipped', guild_id, channel_id=str(intro_channel_id)))
         return
 
-    print(f"Guild {guild_id}: Scanning intro channel history...")
+    if str(guild_id) in history_scan_progress:
+        scan_logger.info("History scan already running, skipping", extra=log_fields('scan_skipped', guild_id))
+        return
 
     # Use cached data to avoid losing recent changes
     guild_data = get_guild_data(guild_id)
     introduced_members = guild_data['introduced']
     pending_members = guild_data['pending']
-
-    try:
-        message_count = 0
-        new_members = 0
-        reactions_added = 0
-        removed_from_pending = 0
-
-        async for message in intro_channel.history(limit=10000):
-            message_count += 1
-            if not message.author.bot and message.author.id not in introduced_members:
-                introduced_members.add(message.author.id)
-                new_members += 1
+    state = guild_data['state']
+
+    if state.get('scanned_channel_id') != intro_channel_id:
+        # New (or changed) intro channel - start over with a full backward scan
+        state.pop('last_scanned_message_id', None)
+        state.pop('history_cursor', None)
+    last_scanned_id = state.get('last_scanned_message_id', 0)
+    full_scan = not last_scanned_id or 'history_cursor' in state
+
+    started_at = time.perf_counter()
+    progress = history_scan_progress[str(guild_id)] = {'messages': 0, 'started': started_at}
+    totals = {'new_intros': 0, 'reactions_queued': 0, 'removed_from_pending': 0}
+    # Found since the last checkpoint - saved together with the scan position they were found up to,
+    # so the saved position never gets ahead of the saved intros
+    unsaved = {'introduced': [], 'pending': [], 'position': {}}
+    pages = 0
+
+    def process_page(messages):
+        """Record the intros in one page of history (saved at the next checkpoint)"""
+        new_intro_ids = {}  # Merged into the sorted introduced array in one pass per page
+        for message in messages:
+            if not message.author.bot and message.author.id not in introduced_members and message.author.id not in new_intro_ids:
+                new_intro_ids[message.author.id] = None
 
                 # Remove from pending if they were being tracked
-                user_id = str(message.author.id)
+                user_id = message.author.id
                 if user_id in pending_members:
                     del pending_members[user_id]
-                    removed_from_pending += 1
-
-                # Add checkmark reaction if it doesn't have one yet
-                try:
-                    has_checkmark = any(str(reaction.emoji) == '✅' for reaction in message.reactions)
-                    if not has_checkmark:
-                        await message.add_reaction('✅')
-                        reactions_added += 1
-                except discord.Forbidden:
-                    pass  # Missing permissions to add reaction
-                except Exception as e:
-                    print(f"Guild {guild_id}: Could not add reaction to message {message.id}: {e}")
-
-        save_guild_introduced(guild_id, introduced_members)
-        if removed_from_pending > 0:
-            save_guild_pending(guild_id, pending_members)
-
-        print(f"Guild {guild_id}: Scanned {message_count} messages, found {new_members} new intros")
-        print(f"Guild {guild_id}: Total introduced members: {len(introduced_members)}")
-        if reactions_added > 0:
-            print(f"Guild {guild_id}: Added ✅ to {reactions_added} messages")
-        if removed_from_pending > 0:
-            print(f"Guild {guild_id}: Removed {removed_from_pending} members from pending list")
-
-        # Update cache
-        if str(guild_id) in guild_data_cache:
-            guild_data_cache[str(guild_id)]['introduced'] = introduced_members
-            guild_data_cache[str(guild_id)]['pending'] = pending_members
+                    unschedule_pending_member(guild_id, user_id)
+                    unsaved['pending'].append(user_id)
+                    totals['removed_from_pending'] += 1
+
+                # Queue a checkmark reaction if it doesn't have one yet (added by the throttled backfill worker)
+                has_checkmark = any(str(reaction.emoji) == '✅' for reaction in message.reactions)
+                if not has_checkmark:
+                    state.setdefault('reaction_backlog', []).append([intro_channel.id, message.id])
+                    totals['reactions_queued'] += 1
+
+        introduced_members.update(new_intro_ids)
+        progress['messages'] += len(messages)
+        totals['new_intros'] += len(new_intro_ids)
+        if new_intro_ids:
+            unsaved['introduced'].extend(new_intro_ids)
+            unmark_untracked(guild_id, new_intro_ids)
+            # Old intros can be from members who have since left
+            adjust_member_counts(guild_id, introduced=sum(1 for user_id in new_intro_ids if intro_channel.guild.get_member(user_id)))
+
+    def checkpoint():
+        """Queue a save of the intros found so far along with the scan position"""
+        if unsaved['introduced']:
+            mark_guild_dirty(guild_id, 'introduced', unsaved['introduced'])
+        if unsaved['pending']:
+            mark_guild_dirty(guild_id, 'pending', unsaved['pending'], reason='introduced')
+        state.update(unsaved['position'])
+        mark_guild_dirty(guild_id, 'state')
+        unsaved.update(introduced=[], pending=[], position={})
+
+    def page_done(position):
+        """Move the scan position past a processed page, checkpointing every SCAN_CHECKPOINT_PAGES"""
+        nonlocal pages
+        unsaved['position'].update(position, scanned_channel_id=intro_channel_id)
+        pages += 1
+        if pages % SCAN_CHECKPOINT_PAGES == 0:
+            checkpoint()
+            elapsed = time.perf_counter() - started_at
+            scan_logger.info(
+                "Scanned %d messages so far (%.0f msg/s)", progress['messages'], progress['messages'] / elapsed,
+                extra=log_fields('scan_progress', guild_id, duration=elapsed, messages=progress['messages'])
+            )
+
+    try:
+        # Newer messages first (oldest to newest), moving the high-water mark as we go
+        if last_scanned_id:
+            scan_logger.info("Scanning intro channel history after message %d...", last_scanned_id, extra=log_fields('scan_started', guild_id, mode='incremental'))
+            page = []
+            async for message in intro_channel.history(limit=None, after=discord.Object(id=last_scanned_id), oldest_first=True):
+                page.append(message)
+                if len(page) == SCAN_PAGE_SIZE:
+                    process_page(page)
+                    page_done({'last_scanned_message_id': page[-1].id})
+                    page = []
+            if page:
+                process_page(page)
+                page_done({'last_scanned_message_id': page[-1].id})
+
+        # Then everything older, newest to oldest, one page at a time
+        if full_scan:
+            cursor = state.get('history_cursor')
+            scan_logger.info(
+                "Scanning intro channel history %s...", f"before message {cursor}" if cursor else "(full scan)",
+                extra=log_fields('scan_started', guild_id, mode='full', resumed=cursor is not None)
+            )
+            while True:
+                before = discord.Object(id=cursor) if cursor else None
+                page = [message async for message in intro_channel.history(limit=SCAN_PAGE_SIZE, before=before)]
+                if not page:
+                    break
+                process_page(page)
+                cursor = page[-1].id
+                position = {'history_cursor': cursor}
+                if not state.get('last_scanned_message_id') and 'last_scanned_message_id' not in unsaved['position']:
+                    position['last_scanned_message_id'] = page[0].id  # Newest message - later scans start here
+                page_done(position)
+
+                if len(page) < SCAN_PAGE_SIZE:
+                    break
+                if SCAN_PAGE_PAUSE_SECONDS:
+                    await asyncio.sleep(SCAN_PAGE_PAUSE_SECONDS)  # Leave room for live traffic
+
+        checkpoint()
+        if full_scan:
+            state.pop('history_cursor', None)  # Reached the start of the channel
+        state['scanned_channel_id'] = intro_channel_id
+
+        # ✅ reactions for the intros queued above
+        if state.get('reaction_backlog'):
+            start_reaction_backfill(guild_id)
+
+        elapsed = time.perf_counter() - started_at
+        scan_logger.info(
+            "Scanned %d messages in %.1fs (%.0f msg/s), found %d new intros (%d introduced in total, queued ✅ for %d, removed %d from pending)",
+            progress['messages'], elapsed, progress['messages'] / elapsed if elapsed else 0, totals['new_intros'],
+            len(introduced_members), totals['reactions_queued'], totals['removed_from_pending'],
+            extra=log_fields(
+                'scan_finished', guild_id, duration=elapsed,
+                messages=progress['messages'], new_intros=totals['new_intros'], introduced=len(introduced_members),
+                reactions_queued=totals['reactions_queued'], removed_from_pending=totals['removed_from_pending'],
+            )
+        )
 
     except discord.Forbidden:
-        print(f"Guild {guild_id}: Missing permissions to read intro channel history")
-    except Exception as e:
-        print(f"Guild {guild_id}: Error scanning intro channel: {e}")
+        scan_logger.warning("Missing permissions to read intro channel history", extra=log_fields('scan_forbidden', guild_id))
+    except Exception:
+        scan_logger.exception("Error scanning intro channel", extra=log_fields('scan_failed', guild_id, duration=time.perf_counter() - started_at))
+    finally:
+        history_scan_progress.pop(str(guild_id), None)
+        # An interrupted scan saves what it processed (the intros are already in memory, so a
+        # rescan would skip them) - the next scan resumes from there
+        checkpoint()
+
+# DM dispatcher - welcomes, reminders and kick notices are queued and delivered by a small
+# worker pool with retry/backoff, so callers never wait on Discord's DM rate limits.
+# Lower priority numbers go first, so a kick notice never waits behind a !trackexisting wave.
+DM_PRIORITY_URGENT = 0  # Kick notices (the kick waits for them)
+DM_PRIORITY_NORMAL = 1  # Welcomes, reminders, intro validation replies
+DM_PRIORITY_BULK = 2  # !trackexisting notifications
+dm_queue = asyncio.PriorityQueue()  # (priority, sequence, job)
+dm_workers = []
+dm_sequence = 0
+dm_stats = {}  # {guild_id: {'queued': 0, 'sent': 0, 'forbidden': 0, 'failed': 0}}
+
+def queue_dm(guild_id, user_id, content, status_key=None, mod_log=None, priority=DM_PRIORITY_NORMAL):
+    """Queue a DM and return a future that resolves to 'sent', 'forbidden' or 'failed'
+
+    status_key (a DM_STATUS_SLOTS key) writes the outcome back to the member's pending entry;
+    mod_log is a (message, color, kind) tuple logged once the DM has actually been sent.
+    """
+    global dm_sequence
+    guild_id = str(guild_id)
+    loop = asyncio.get_running_loop()
+    while len(dm_workers) < DM_WORKER_COUNT:
+        dm_workers.append(loop.create_task(dm_worker()))
+
+    future = loop.create_future()
+    dm_sequence += 1
+    dm_queue.put_nowait((priority, dm_sequence, (guild_id, user_id, content, status_key, mod_log, future)))
+    guild_stats = dm_stats.setdefault(guild_id, {'queued': 0, 'sent': 0, 'forbidden': 0, 'failed': 0})
+    guild_stats['queued'] += 1
+    return future
+
+async def dm_worker():
+    """Deliver queued DMs one at a time (DM_WORKER_COUNT of these run in parallel)"""
+    while True:
+        _, _, (guild_id, user_id, content, status_key, mod_log, future) = await dm_queue.get()
+        try:
+            status = await deliver_dm(guild_id, user_id, content)
+            dm_stats[guild_id][status] += 1
+            if status != 'sent':
+                inc_counter('allo_dm_failures_total', guild=guild_id, reason=status)
+            elif status_key and status_key.startswith('reminder_'):
+                inc_counter('allo_reminders_total', guild=guild_id)
+
+            if status_key:
+                entry = get_guild_data(guild_id)['pending'].get(user_id)
+                if entry is not None:
+                    entry.set_dm_status(status_key, status)
+                    mark_guild_dirty(guild_id, 'pending', [user_id], reason='dm_status')
+
+            if status == 'sent' and mod_log:
+                log_to_mod_channel(guild_id, *mod_log)
+
+            if not future.done():
+                future.set_result(status)
+        except Exception:
+            dm_logger.exception("DM worker error", extra=log_fields('dm_worker_error', guild_id, user_id))
+            if not future.done():
+                future.set_result('failed')
+        finally:
+            dm_queue.task_done()
+
+async def deliver_dm(guild_id, user_id, content):
+    """Send one DM, retrying with exponential backoff on rate limits and server errors"""
+    for attempt in range(DM_MAX_ATTEMPTS):
+        try:
+            channel = await bot.create_dm(discord.Object(id=int(user_id)))
+            with observe_duration('allo_discord_api_seconds', call='send_dm'):
+                await channel.send(content)
+            return 'sent'
+        except discord.Forbidden:
+            dm_logger.info("Could not send DM (DMs closed)", extra=log_fields('dm_forbidden', guild_id, user_id))
+            return 'forbidden'
+        except discord.HTTPException as e:
+            if e.status != 429 and e.status < 500:
+                dm_logger.warning("Could not send DM: %s", e, extra=log_fields('dm_failed', guild_id, user_id, status=e.status))
+                return 'failed'
+            error = e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = e
+
+        delay = DM_RETRY_BASE_SECONDS * 2 ** attempt * random.uniform(1, 1.5)
+        dm_logger.info("DM failed (%s), retrying in %.0fs", error, delay, extra=log_fields('dm_retry', guild_id, user_id, attempt=attempt))
+        await asyncio.sleep(delay)
+
+    return 'failed'
+
+# Reaction backfill - ✅ reactions for old intros found by history scans are added by a
+# low-priority worker at REACTIONS_PER_MINUTE, so scans run at read speed and don't compete
+# with DMs and kicks. The backlog lives in guild state, so progress survives restarts. The
+# state record holds the whole backlog, so it is only rewritten every BACKFILL_CHECKPOINT_ITEMS.
+reaction_backfill_guilds = set()
+reaction_backfill_task = None
+reaction_stats = {'added': 0, 'failed': 0}
+
+def start_reaction_backfill(guild_id):
+    """Make sure the backfill worker is draining a guild's reaction backlog"""
+    global reaction_backfill_task
+    reaction_backfill_guilds.add(str(guild_id))
+    if reaction_backfill_task is None or reaction_backfill_task.done():
+        reaction_backfill_task = asyncio.get_running_loop().create_task(reaction_backfill_loop())
+
+def checkpoint_backfills():
+    """Queue a save of every running backfill's progress (used on shutdown)"""
+    for guild_id in reaction_backfill_guilds | role_backfill_guilds:
+        mark_guild_dirty(guild_id, 'state')
+
+def get_reaction_backlog_size():
+    """Count queued backfill reactions across all guilds"""
+    return sum(len(get_guild_data(guild_id)['state'].get('reaction_backlog', [])) for guild_id in reaction_backfill_guilds)
+
+async def reaction_backfill_loop():
+    """Add queued ✅ reactions one at a time, round-robin across guilds, within the rate budget"""
+    while reaction_backfill_guilds:
+        for guild_id in list(reaction_backfill_guilds):
+            state = get_guild_data(guild_id)['state']
+            backlog = state.get('reaction_backlog')
+            if not backlog:
+                reaction_backfill_guilds.discard(guild_id)
+                state.pop('reaction_backlog', None)
+                mark_guild_dirty(guild_id, 'state')
+                reaction_logger.info("Reaction backfill complete", extra=log_fields('reaction_backfill_finished', guild_id))
+                continue
+
+            channel_id, message_id = backlog.pop()
+            channel = bot.get_channel(channel_id)
+            try:
+                if channel:
+                    with observe_duration('allo_discord_api_seconds', call='add_reaction'):
+                        await channel.get_partial_message(message_id).add_reaction('✅')
+                    reaction_stats['added'] += 1
+            except discord.NotFound:
+                pass  # Message was deleted since the scan
+            except discord.Forbidden:
+                # No permission to react in this channel - nothing else in the backlog will work either
+                reaction_logger.warning("Missing permissions to add reactions, dropping %d queued reactions", len(backlog), extra=log_fields('reaction_forbidden', guild_id))
+                reaction_stats['failed'] += len(backlog) + 1
+                backlog.clear()
+            except Exception as e:
+                reaction_stats['failed'] += 1
+                reaction_logger.warning("Could not add reaction to message %d: %s", message_id, e, extra=log_fields('reaction_failed', guild_id, message_id=str(message_id)))
+            if len(backlog) % BACKFILL_CHECKPOINT_ITEMS == 0:
+                mark_guild_dirty(guild_id, 'state')  # Checkpoint - re-adding a ✅ after a crash is a no-op
+
+            await asyncio.sleep(60 / REACTIONS_PER_MINUTE)
+
+# Welcome role backfill - !rolebackfill start queues every introduced member who is missing
+# the welcome role, and ROLE_BACKFILL_WORKERS workers assign it within ROLES_PER_MINUTE. The job
+# (queue and counts) lives in guild state, checkpointed every BACKFILL_CHECKPOINT_ITEMS members,
+# so it resumes after a restart.
+role_backfill_guilds = set()
+role_backfill_tasks = []
+
+def can_manage_member(member):
+    """Whether the bot's top role is above the member's (Discord refuses role edits otherwise)"""
+    return member.top_role < member.guild.me.top_role
+
+async def create_role_backfill(guild, role):
+    """Queue the introduced members of a guild who don't have the role yet, returning the job"""
+    guild_id = str(guild.id)
+    await ensure_member_cache(guild)
+    introduced_members = get_guild_data(guild_id)['introduced']
+    queue = []
+    skipped = 0
+    for i, user_id in enumerate(introduced_members.copy_ids()):
+        if i % RECOUNT_SLICE_SIZE == 0:
+            await asyncio.sleep(0)  # Yield between slices on big servers
+        member = guild.get_member(user_id)
+        if member is None or member.bot or role in member.roles:
+            continue
+        if not can_manage_member(member):
+            skipped += 1  # Above the bot in the role list - would only get a Forbidden
+            continue
+        queue.append(user_id)
+
+    job = {'role_id': role.id, 'queue': queue, 'total': len(queue) + skipped, 'assigned': 0, 'skipped': skipped, 'left': 0, 'failed': 0, 'started': int(time.time())}
+    get_guild_data(guild_id)['state']['role_backfill'] = job
+    mark_guild_dirty(guild_id, 'state')
+    start_role_backfill(guild_id)
+    return job
+
+def start_role_backfill(guild_id):
+    """Make sure the role workers are draining a guild's backfill queue"""
+    role_backfill_guilds.add(str(guild_id))
+    role_backfill_tasks[:] = [task for task in role_backfill_tasks if not task.done()]
+    while len(role_backfill_tasks) < ROLE_BACKFILL_WORKERS:
+        role_backfill_tasks.append(asyncio.get_running_loop().create_task(role_backfill_worker()))
+
+def finish_role_backfill(guild_id, job, reason):
+    """Close a guild's job (the summary stays in state for !rolebackfill)"""
+    role_backfill_guilds.discard(guild_id)
+    if 'finished' in job:
+        return  # Another worker got here first
+    job['queue'] = []
+    job['finished'] = int(time.time())
+    job['result'] = reason
+    mark_guild_dirty(guild_id, 'state')
+    summary = f"{job['assigned']} assigned, {job['skipped']} skipped, {job.get('left', 0)} left, {job['failed']} failed"
+    member_logger.info("Welcome role backfill %s: %s", reason, summary, extra=log_fields('role_backfill_finished', guild_id, result=reason))
+    log_to_mod_channel(guild_id, f"🎭 Welcome role backfill {reason}: {summary}", discord.Color.green(), kind='roles')
+
+async def role_backfill_worker():
+    """Assign queued welcome roles one at a time, round-robin across guilds, within the rate budget"""
+    while role_backfill_guilds:
+        for guild_id in list(role_backfill_guilds):
+            job = get_guild_data(guild_id)['state'].get('role_backfill')
+            if not job or 'finished' in job:
+                role_backfill_guilds.discard(guild_id)
+                continue
+            if not job['queue']:
+                finish_role_backfill(guild_id, job, 'complete')
+                continue
+
+            guild = bot.get_guild(int(guild_id))
+            role = guild.get_role(job['role_id']) if guild else None
+            if role is None:
+                finish_role_backfill(guild_id, job, 'stopped (role or server no longer available)')
+                continue
+
+            # A job resumed after a restart in lazy mode would otherwise see an empty cache
+            await ensure_member_cache(guild)
+            if not job['queue'] or 'finished' in job:
+                continue  # Drained or stopped while the members loaded
+
+            user_id = job['queue'].pop()
+            member = guild.get_member(user_id)
+            try:
+                if member is None:
+                    job['left'] = job.get('left', 0) + 1  # Jobs saved by older versions have no count
+                    continue
+                if role in member.roles or not can_manage_member(member):
+                    job['skipped'] += 1  # Got the role some other way meanwhile, or now above the bot
+                    continue
+                with observe_duration('allo_discord_api_seconds', call='add_roles'):
+                    await member.add_roles(role, reason="Welcome role backfill")
+                job['assigned'] += 1
+            except discord.Forbidden:
+                # Missing Manage Roles or the role is above the bot - the rest would fail too
+                job['failed'] += 1
+                finish_role_backfill(guild_id, job, 'stopped (missing permissions)')
+                continue
+            except Exception as e:
+                job['failed'] += 1
+                member_logger.warning("Could not assign welcome role: %s", e, extra=log_fields('role_backfill_failed', guild_id, user_id))
+            finally:
+                if len(job['queue']) % BACKFILL_CHECKPOINT_ITEMS == 0:
+                    mark_guild_dirty(guild_id, 'state')  # Checkpoint - members redone after a crash already have the role
+
+            await asyncio.sleep(ROLE_BACKFILL_WORKERS * 60 / ROLES_PER_MINUTE)
+
+# Departed members - a member who leaves is dropped from pending straight away. Their
+# introduced entry is tombstoned rather than cut out of the sorted array one at a time, and
+# the compactor removes all of a guild's tombstones in one pass every
+# TOMBSTONE_COMPACT_SECONDS. Tombstones are kept in memory only, so a leave or rejoin never
+# rewrites the guild state; they are compacted on shutdown, and any lost to a crash just
+# leave departed members counted as introduced until `!cleanup full`.
+tombstones = {}  # {guild_id: set of departed introduced user IDs}
+tombstone_compaction_task = None
+departure_stats = {'left': 0, 'pending_dropped': 0, 'tombstones_compacted': 0}
+
+def add_tombstone(guild_id, user_id):
+    """Tombstone a departed member's introduced entry and make sure the compactor will clear it"""
+    global tombstone_compaction_task
+    tombstones.setdefault(str(guild_id), set()).add(user_id)
+    if tombstone_compaction_task is None or tombstone_compaction_task.done():
+        tombstone_compaction_task = asyncio.get_running_loop().create_task(tombstone_compaction_loop())
+
+def compact_tombstones(guild_id):
+    """Remove a guild's tombstoned introduced entries, returning how many were removed"""
+    guild_id = str(guild_id)
+    departed = tombstones.pop(guild_id, None)
+    if not departed:
+        return 0
+    removed = get_guild_data(guild_id)['introduced'].difference_update(departed)
+    if removed:
+        mark_guild_dirty(guild_id, 'introduced', removed)
+    departure_stats['tombstones_compacted'] += len(removed)
+    return len(removed)
+
+def compact_all_tombstones():
+    """Compact every guild's tombstones, so a clean shutdown saves them as removed"""
+    for guild_id in list(tombstones):
+        compact_tombstones(guild_id)
+
+async def tombstone_compaction_loop():
+    """Compact every guild with tombstones each TOMBSTONE_COMPACT_SECONDS until none are left"""
+    while tombstones:
+        await asyncio.sleep(TOMBSTONE_COMPACT_SECONDS)
+        for guild_id in list(tombstones):
+            removed = compact_tombstones(guild_id)
+            if removed:
+                member_logger.info("Compacted %d departed introduced members", removed, extra=log_fields('tombstones_compacted', guild_id, removed=removed))
+
+def resume_background_jobs(guild_id):
+    """Restart the reaction backlog, tombstone compaction and role backfill saved in a guild's state"""
+    state = get_guild_data(guild_id)['state']
+    if state.get('reaction_backlog'):
+        start_reaction_backfill(guild_id)
+    if 'departed_introduced' in state:
+        # Tombstones saved in state by older versions
+        for user_id in state.pop('departed_introduced'):
+            add_tombstone(guild_id, user_id)
+        mark_guild_dirty(guild_id, 'state')
+    job = state.get('role_backfill')
+    if job and 'finished' not in job:
+        start_role_backfill(guild_id)  # An emptied queue is closed by the worker
+
+# Event handler latency - time from an event arriving to its handler finishing (excluding
+# command dispatch), so a slow path shows up in !botstatus
+event_latency_stats = {}  # {event: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}}
+
+def record_event_latency(event, started_at):
+    """Add one handler run (started at the given perf_counter time) to the latency stats"""
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    stats = event_latency_stats.setdefault(event, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+    stats['count'] += 1
+    stats['total_ms'] += elapsed_ms
+    stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+# Startup scans run in the background - guilds stay "warming" (no reminders or kicks)
+# until their intro channel history has been scanned
+warming_guilds = set()
+startup_scans_started = False
+
+async def run_startup_scans(guilds):
+    """Scan intro channel history for the given guilds, STARTUP_SCAN_CONCURRENCY at a time"""
+    semaphore = asyncio.Semaphore(STARTUP_SCAN_CONCURRENCY)
+    started_at = time.monotonic()
+    finished = 0
+
+    async def scan_guild(guild):
+        nonlocal finished
+        guild_id = str(guild.id)
+        async with semaphore:
+            guild_started_at = time.monotonic()
+            try:
+                if MEMBER_CACHE_MODE == 'lazy' and (guild.member_count or 0) <= LAZY_CHUNK_MAX_MEMBERS:
+                    await ensure_member_cache(guild)
+                config = get_guild_data(guild_id)['config']
+                with observe_duration('allo_history_scan_seconds'), profile_section('scan'):
+                    await scan_intro_channel_history(guild_id, config.get('intro_channel_id', 0))
+            finally:
+                finish_guild_warmup(guild_id)
+                # Work left over from before the restart - whether or not the scan succeeded
+                resume_background_jobs(guild_id)
+                finished += 1
+                guild_seconds = time.monotonic() - guild_started_at
+                scan_logger.info(
+                    "Startup scan done in %.1fs (%d/%d guilds)", guild_seconds, finished, len(guilds),
+                    extra=log_fields('startup_scan_finished', guild_id, duration=guild_seconds)
+                )
+
+    await asyncio.gather(*(scan_guild(guild) for guild in guilds))
+    total_seconds = time.monotonic() - started_at
+    scan_logger.info(
+        "Startup scans finished for %d guild(s) in %.1fs", len(guilds), total_seconds,
+        extra=log_fields('startup_scans_finished', duration=total_seconds, guilds=len(guilds))
+    )
+
+def finish_guild_warmup(guild_id):
+    """Mark a guild's startup scan complete and schedule the members held back while it ran"""
+    if guild_id in warming_guilds:
+        warming_guilds.discard(guild_id)
+        schedule_guild_pending(guild_id, get_guild_data(guild_id)['pending'])
+
+def get_owned_guilds():
+    """Guilds this process is responsible for (the gateway only sends our shards' guilds anyway)"""
+    return [guild for guild in bot.guilds if owns_guild(guild.id)]
+
+# Per-shard connection health, updated by the on_shard_* events (AutoShardedBot only)
+shard_stats = {}  # {shard_id: {'connected': bool, 'since': timestamp, 'disconnects': int, 'resumes': int}}
+
+def update_shard_stats(shard_id, connected, counter=None):
+    stats = shard_stats.setdefault(shard_id, {'connected': False, 'since': time.time(), 'disconnects': 0, 'resumes': 0})
+    if stats['connected'] != connected:
+        stats['connected'] = connected
+        stats['since'] = time.time()
+    if counter:
+        stats[counter] += 1
+
+@bot.event
+async def on_shard_ready(shard_id):
+    update_shard_stats(shard_id, True)
+    bot_logger.info("Shard %d: Ready", shard_id, extra=log_fields('shard_ready', shard=shard_id))
+
+@bot.event
+async def on_shard_resumed(shard_id):
+    update_shard_stats(shard_id, True, 'resumes')
+
+@bot.event
+async def on_shard_disconnect(shard_id):
+    update_shard_stats(shard_id, False, 'disconnects')
+    bot_logger.warning("Shard %d: Disconnected from the gateway", shard_id, extra=log_fields('shard_disconnected', shard=shard_id))
 
 @bot.event
 async def on_ready():
     """Called when bot is ready"""
-    print(f'{bot.user} has connected to Discord!')
-    print(f'Bot is in {len(bot.guilds)} guild(s)')
-
-    # Scan intro channel history for ALL guilds on startup
-    for guild in bot.guilds:
-        guild_id = str(guild.id)
-        config = load_guild_config(guild_id)
-        intro_channel_id = config.get('intro_channel_id', 0)
-        await scan_intro_channel_history(guild_id, intro_channel_id)
+    global startup_scans_started
+    bot_logger.info("%s has connected to Discord!", bot.user, extra=log_fields('ready', guilds=len(bot.guilds)))
+    bot_logger.info("Bot is in %d guild(s)", len(bot.guilds))
+    if SHARD_COUNT:
+        bot_logger.info("Running shard(s) %s of %d", ', '.join(str(shard_id) for shard_id in sorted(bot.shards)), SHARD_COUNT)
+
+    # on_ready fires again after a full reconnect - only scan once per process
+    if not startup_scans_started:
+        startup_scans_started = True
+        guilds = get_owned_guilds()
+        # Index every guild's intro channel up front so intros are seen before the guild is loaded
+        for guild in guilds:
+            load_guild_config(guild.id)
+        warming_guilds.update(str(guild.id) for guild in guilds)
+        # Scan intro channel history for ALL of this process's guilds in the background
+        asyncio.create_task(run_startup_scans(guilds))
 
     # Start the background task to check for non-introduced members (if enabled)
     if ENABLE_BACKGROUND_CHECKS:
         if not check_introductions.is_running():
             check_introductions.start()
-            print("Background reminder/kick checks: ENABLED")
+            check_logger.info("Background reminder/kick checks: ENABLED")
     else:
-        print("⚠️ Background reminder/kick checks: DISABLED (set ENABLE_BACKGROUND_CHECKS=True to enable)")
+        check_logger.warning("⚠️ Background reminder/kick checks: DISABLED (set ENABLE_BACKGROUND_CHECKS=True to enable)")
+
+@bot.event
+async def on_guild_join(guild):
+    """Pick up the intro channel of a server the bot was re-added to"""
+    load_guild_config(guild.id)
+
+@bot.event
+async def on_raw_member_remove(payload):
+    """Stop tracking a member who left (raw, so members missing from the cache are seen too)"""
+    guild_id = str(payload.guild_id)
+    user_id = payload.user.id
+    unmark_untracked(guild_id, [user_id])
+    if payload.user.bot:
+        return
+
+    guild_data = get_guild_data(guild_id)
+    departure_stats['left'] += 1
+    adjust_member_counts(guild_id, humans=-1, introduced=-int(user_id in guild_data['introduced']))
+    if user_id in guild_data['pending']:
+        del guild_data['pending'][user_id]
+        unschedule_pending_member(guild_id, user_id)
+        mark_guild_dirty(guild_id, 'pending', [user_id], reason='left')
+        departure_stats['pending_dropped'] += 1
+        member_logger.info("Member left server, removing from tracking", extra=log_fields('member_left', guild_id, user_id))
+
+    if user_id in guild_data['introduced']:
+        add_tombstone(guild_id, user_id)
 
 @bot.event
 async def on_member_join(member):
@@ -233,37 +2261,42 @@ async def on_member_join(member):
     exempt_role_ids = config.get('exempt_role_ids', [])
     intro_channel_id = config.get('intro_channel_id', 0)
 
+    # Back before their introduced entry was compacted - keep it
+    tombstones.get(guild_id, set()).discard(member.id)
+    adjust_member_counts(guild_id, humans=1, introduced=int(member.id in guild_data['introduced']))
+
     # Check if member is exempt
     if is_member_exempt(member, exempt_role_ids):
-        print(f'Guild {guild_id}: {member.name} joined (exempt from intro requirement)')
+        member_logger.info("%s joined (exempt from intro requirement)", member.name, extra=log_fields('member_joined', guild_id, member.id, exempt=True))
+        if member.id not in guild_data['introduced']:
+            mark_untracked(guild_id, member.id)
         return
 
-    print(f'Guild {guild_id}: {member.name} joined the server')
+    member_logger.info("%s joined the server", member.name, extra=log_fields('member_joined', guild_id, member.id))
 
     # Get grace period for this member
     grace_hours = get_member_grace_period(member)
 
-    # Add to pending members with current timestamp and dynamic reminder keys
-    reminder_data = {'join_time': datetime.utcnow().isoformat()}
-    for reminder_hour in REMINDER_TIMES:
-        reminder_data[f'reminded_{reminder_hour}'] = False
-
-    pending_members[str(member.id)] = reminder_data
-    save_guild_pending(guild_id, pending_members)
+    # Add to pending members with the current time (no reminders sent yet)
+    entry = PendingEntry(int(time.time()))
+    pending_members[member.id] = entry
+    schedule_pending_member(guild_id, member.id, entry, grace_hours)
+    mark_guild_dirty(guild_id, 'pending', [member.id], reason='joined')
+    unmark_untracked(guild_id, [member.id])
+    inc_counter('allo_joins_total', guild=guild_id)
 
     # Send initial welcome DM
-    try:
-        intro_channel = bot.get_channel(intro_channel_id)
-        booster_msg = f" (Server boosters get {grace_hours} hours!)" if member.premium_since and BOOSTER_GRACE_HOURS > 0 else ""
-        await member.send(
-            f"Welcome to the server! Please introduce yourself in {intro_channel.mention} "
-            f"within {grace_hours} hours to avoid being removed.{booster_msg}"
-        )
-    except discord.Forbidden:
-        print(f"Guild {guild_id}: Could not send DM to {member.name}")
+    intro_channel = bot.get_channel(intro_channel_id)
+    booster_msg = f" (Server boosters get {grace_hours} hours!)" if member.premium_since and BOOSTER_GRACE_HOURS > 0 else ""
+    queue_dm(
+        guild_id, member.id,
+        f"Welcome to the server! Please introduce yourself in {intro_channel.mention} "
+        f"within {grace_hours} hours to avoid being removed.{booster_msg}",
+        status_key='welcome'
+    )
 
     # Log to mod channel
-    await log_to_mod_channel(guild_id, f"👋 **{member.mention}** joined - tracking for introduction ({grace_hours}h grace period)", discord.Color.blue())
+    log_to_mod_channel(guild_id, f"👋 **{member.mention}** joined - tracking for introduction ({grace_hours}h grace period)", discord.Color.blue(), kind='joins')
 
 @bot.event
 async def on_message(message):
@@ -271,6 +2304,14 @@ async def on_message(message):
     if message.author.bot:
         return
 
+    started_at = time.perf_counter()
+
+    # Fast path - DMs and messages outside intro channels never touch guild data
+    if message.guild is None or message.channel.id not in intro_channel_guilds:
+        record_event_latency('on_message (fast path)', started_at)
+        await bot.process_commands(message)
+        return
+
     # Load guild-specific data
     guild_id = str(message.guild.id)
     guild_data = get_guild_data(guild_id)
@@ -283,46 +2324,48 @@ async def on_message(message):
 
     # If message is in intro channel, validate and process introduction
     if message.channel.id == intro_channel_id:
-        user_id = str(message.author.id)
+        user_id = message.author.id
+        rules = get_intro_rules(guild_id, config)
 
         # Validate minimum length
-        if MIN_INTRO_LENGTH > 0 and len(message.content) < MIN_INTRO_LENGTH:
+        if rules.min_length > 0 and len(message.content) < rules.min_length:
             await message.delete()
-            try:
-                await message.author.send(
-                    f"Your introduction was too short. Please write at least {MIN_INTRO_LENGTH} characters. "
-                    f"Tell us about yourself!"
-                )
-            except discord.Forbidden:
-                pass
+            queue_dm(
+                guild_id, message.author.id,
+                f"Your introduction was too short. Please write at least {rules.min_length} characters. "
+                f"Tell us about yourself!"
+            )
+            record_event_latency('on_message (intro)', started_at)
             return
 
         # Validate required keywords
-        if REQUIRE_KEYWORDS:
-            content_lower = message.content.lower()
-            missing_keywords = [kw for kw in REQUIRE_KEYWORDS if kw.lower() not in content_lower]
+        if rules.keywords:
+            missing_keywords = rules.find_missing_keywords(message.content)
             if missing_keywords:
                 await message.delete()
-                try:
-                    await message.author.send(
-                        f"Your introduction is missing required information. "
-                        f"Please include: {', '.join(missing_keywords)}"
-                    )
-                except discord.Forbidden:
-                    pass
+                queue_dm(
+                    guild_id, message.author.id,
+                    f"Your introduction is missing required information. "
+                    f"Please include: {', '.join(missing_keywords)}"
+                )
+                record_event_latency('on_message (intro)', started_at)
                 return
 
         # Valid introduction - add to introduced members cache
         if message.author.id not in introduced_members:
             introduced_members.add(message.author.id)
-            save_guild_introduced(guild_id, introduced_members)
+            mark_guild_dirty(guild_id, 'introduced', [message.author.id])
+            unmark_untracked(guild_id, [message.author.id])
+            adjust_member_counts(guild_id, introduced=1)
 
         # Remove from pending if they were being tracked
         was_pending = user_id in pending_members
         if was_pending:
-            print(f'Guild {guild_id}: {message.author.name} posted introduction')
+            member_logger.info("%s posted introduction", message.author.name, extra=log_fields('intro_posted', guild_id, user_id))
             del pending_members[user_id]
-            save_guild_pending(guild_id, pending_members)
+            unschedule_pending_member(guild_id, user_id)
+            mark_guild_dirty(guild_id, 'pending', [user_id], reason='introduced')
+            inc_counter('allo_intros_total', guild=guild_id)
 
         # Assign welcome role if configured
         if welcome_role_id != 0:
@@ -330,238 +2373,287 @@ async def on_message(message):
                 role = message.guild.get_role(welcome_role_id)
                 if role and role not in message.author.roles:
                     await message.author.add_roles(role, reason="Posted introduction")
-                    print(f"Guild {guild_id}: Assigned welcome role to {message.author.name}")
+                    member_logger.info("Assigned welcome role to %s", message.author.name, extra=log_fields('welcome_role_assigned', guild_id, user_id))
             except discord.Forbidden:
-                print(f"Guild {guild_id}: Missing permissions to assign welcome role to {message.author.name}")
+                member_logger.warning("Missing permissions to assign welcome role to %s", message.author.name, extra=log_fields('welcome_role_forbidden', guild_id, user_id))
 
         # React to their intro
-        await message.add_reaction('✅')
+        with observe_duration('allo_discord_api_seconds', call='add_reaction'):
+            await message.add_reaction('✅')
 
         # Log to mod channel
         if was_pending:
-            await log_to_mod_channel(
+            log_to_mod_channel(
                 guild_id,
                 f"✅ **{message.author.mention}** posted their introduction - no longer tracking",
-                discord.Color.green()
+                discord.Color.green(),
+                kind='intros'
             )
 
+        record_event_latency('on_message (intro)', started_at)
+
     # Process commands
     await bot.process_commands(message)
 
-@tasks.loop(minutes=CHECK_INTERVAL_MINUTES)
+@tasks.loop()
 async def check_introductions():
-    """Periodically check for members who haven't introduced themselves"""
-    print("Checking for members who haven't introduced themselves...")
+    """Send reminders and kick members whose next scheduled event is due"""
+    await wait_for_due_members()
 
-    current_time = datetime.utcnow()
+    due_by_guild = pop_due_members(time.time())
+    check_logger.info(
+        "Checking %d due member(s) for introductions...", sum(len(user_ids) for user_ids in due_by_guild.values()),
+        extra=log_fields('check_started', guilds=len(due_by_guild))
+    )
 
-    # Check ALL guilds
-    for guild in bot.guilds:
-        guild_id = str(guild.id)
-        guild_data = get_guild_data(guild_id)
-        config = guild_data['config']
-        pending_members = guild_data['pending']
+    with observe_duration('allo_check_loop_seconds'), profile_section('checks'):
+        for guild_id, user_ids in due_by_guild.items():
+            guild = bot.get_guild(int(guild_id))
+            if not guild:
+                # Bot is no longer in this guild - nothing to remind or kick
+                continue
+            if guild_id in warming_guilds:
+                # Startup scan still running - these members are rescheduled when it finishes
+                continue
+            with hold_guild_data(guild_id):
+                await process_due_members(guild, user_ids)
 
-        intro_channel_id = config.get('intro_channel_id', 0)
-        intro_channel = bot.get_channel(intro_channel_id)
+async def process_due_members(guild, user_ids):
+    """Handle reminders/kicks for the due members of one guild, then reschedule the rest"""
+    guild_id = str(guild.id)
+    guild_data = get_guild_data(guild_id)
+    config = guild_data['config']
+    pending_members = guild_data['pending']
 
-        to_remove = []
-        save_needed = False
+    intro_channel_id = config.get('intro_channel_id', 0)
+    intro_channel = bot.get_channel(intro_channel_id)
 
-        # Use list() to create snapshot and avoid "dictionary changed size during iteration" error
-        for user_id, user_data in list(pending_members.items()):
-            join_time = datetime.fromisoformat(user_data['join_time'])
-            time_elapsed = current_time - join_time
-            hours_elapsed = time_elapsed.total_seconds() / 3600
+    # Find the members in this guild (looked up in batches if they aren't cached)
+    members, departed = await resolve_members(guild, [user_id for user_id in user_ids if user_id in pending_members])
 
-            # Find the member in this guild
-            member = guild.get_member(int(user_id))
+    current_time = time.time()
+    to_remove = {}  # {user_id: reason}
+    reminded = set()
 
-            if not member:
-                # Member left the server - remove from tracking
-                to_remove.append(user_id)
-                print(f"Guild {guild_id}: Member {user_id} left server, removing from tracking")
-                continue
+    for user_id in user_ids:
+        entry = pending_members.get(user_id)
+        if entry is None:
+            continue  # Untracked since it was scheduled
+
+        hours_elapsed = (current_time - entry.join_ts) / 3600
+
+        member = members.get(user_id)
 
-            # Calculate time until deadline
-            if 'deadline' in user_data:
-                # Member has custom deadline (from !trackexisting)
-                deadline = datetime.fromisoformat(user_data['deadline'])
-                time_until_deadline = deadline - current_time
-                hours_until_deadline = time_until_deadline.total_seconds() / 3600
-                # Calculate effective grace hours for reminder/kick logic
-                member_grace_hours = hours_elapsed + hours_until_deadline
+        if not member:
+            if user_id in departed:
+                # Member left the server - remove from tracking
+                to_remove[user_id] = 'left'
+                check_logger.info("Member left server, removing from tracking", extra=log_fields('member_left', guild_id, user_id))
             else:
-                # Use default grace period (might be different for boosters)
-                member_grace_hours = get_member_grace_period(member)
-
-            # Send reminders based on REMINDER_TIMES config
-            # Only send ONE reminder per check cycle to avoid spam
-            reminder_sent_this_cycle = False
-
-            # If member has custom deadline > 24h, send extra 24h reminder
-            if 'deadline' in user_data and member_grace_hours > GRACE_PERIOD_HOURS:
-                # Check if we need to send 24-hour remaining reminder
-                reminder_24h_key = 'reminded_24h_remaining'
-                if reminder_24h_key not in user_data:
-                    user_data[reminder_24h_key] = False
-
-                hours_until_deadline = member_grace_hours - hours_elapsed
-                if hours_until_deadline <= 24 and not user_data[reminder_24h_key] and not reminder_sent_this_cycle:
-                    hours_left = member_grace_hours - hours_elapsed
-                    try:
-                        await member.send(
-                            f"**Reminder:** You have **24 hours** remaining to introduce yourself in {intro_channel.mention}. "
-                            f"Please post your introduction to avoid being removed from the server."
-                        )
-                        print(f"Guild {guild_id}: Sent 24h-remaining reminder to {member.name}")
-                        user_data[reminder_24h_key] = True
-                        save_needed = True
-                        reminder_sent_this_cycle = True
-
-                        # Log to mod channel
-                        await log_to_mod_channel(
-                            guild_id,
-                            f"⏰ Sent 24h-remaining reminder to **{member.mention}** ({hours_left:.0f}h remaining)",
-                            discord.Color.orange()
-                        )
-                    except discord.Forbidden:
-                        print(f"Guild {guild_id}: Could not send 24h-remaining reminder to {member.name}")
+                # Lookup failed - try again on the next check cycle
+                schedule_at(guild_id, user_id, current_time + CHECK_INTERVAL_MINUTES * 60)
+            continue
 
-            for i, reminder_hour in enumerate(REMINDER_TIMES):
-                reminder_key = f'reminded_{reminder_hour}'
+        # Calculate time until deadline
+        if entry.deadline_ts:
+            # Member has custom deadline (from !trackexisting)
+            hours_until_deadline = (entry.deadline_ts - current_time) / 3600
+            # Calculate effective grace hours for reminder/kick logic
+            member_grace_hours = hours_elapsed + hours_until_deadline
+        else:
+            # Use default grace period (might be different for boosters)
+            member_grace_hours = get_member_grace_period(member)
+
+        # Send reminders based on REMINDER_TIMES config
+        # Only send ONE reminder per check cycle to avoid spam
+        reminder_sent_this_cycle = False
+
+        # If member has custom deadline > 24h, send extra 24h reminder
+        if entry.deadline_ts and member_grace_hours > GRACE_PERIOD_HOURS:
+            # Check if we need to send 24-hour remaining reminder
+            hours_until_deadline = member_grace_hours - hours_elapsed
+            if hours_until_deadline <= 24 and not entry.reminded & REMINDED_24H_REMAINING and not reminder_sent_this_cycle:
+                hours_left = member_grace_hours - hours_elapsed
+                # Queue the DM - its delivery status is written back to the entry,
+                # and the mod log entry is posted once it has actually been sent
+                queue_dm(
+                    guild_id, member.id,
+                    f"**Reminder:** You have **24 hours** remaining to introduce yourself in {intro_channel.mention}. "
+                    f"Please post your introduction to avoid being removed from the server.",
+                    status_key='reminder_24h_remaining',
+                    mod_log=(
+                        f"⏰ Sent 24h-remaining reminder to **{member.mention}** ({hours_left:.0f}h remaining)",
+                        discord.Color.orange(),
+                        'reminders'
+                    )
+                )
+                check_logger.info("Queued 24h-remaining reminder for %s", member.name, extra=log_fields('reminder_queued', guild_id, user_id, reminder='24h_remaining'))
+                entry.reminded |= REMINDED_24H_REMAINING
+                reminded.add(user_id)
+                reminder_sent_this_cycle = True
 
-                # Initialize reminder key if it doesn't exist (for backwards compatibility)
-                if reminder_key not in user_data:
-                    user_data[reminder_key] = False
+        for i, reminder_hour in enumerate(REMINDER_TIMES):
+            reminder_bit = get_reminder_bit(i)
 
-                # Skip if already sent
-                if user_data[reminder_key]:
-                    continue
+            # Skip if already sent
+            if entry.reminded & reminder_bit:
+                continue
 
-                # Check if it's time for this reminder
-                if hours_elapsed >= reminder_hour and not reminder_sent_this_cycle:
-                    # For catch-up: only send the LAST unsent reminder, skip earlier ones
-                    # Check if there are later reminders we should send instead
-                    should_skip = False
-                    for j in range(i + 1, len(REMINDER_TIMES)):
-                        later_reminder_hour = REMINDER_TIMES[j]
-                        if hours_elapsed >= later_reminder_hour:
-                            # There's a later reminder we should send instead
-                            should_skip = True
-                            # Mark this one as sent so we don't try again
-                            user_data[reminder_key] = True
-                            save_needed = True
-                            print(f"Guild {guild_id}: Skipped {reminder_hour}-hour reminder for {member.name} (sending later reminder instead)")
-                            break
-
-                    if not should_skip:
-                        hours_left = member_grace_hours - hours_elapsed
-
-                        # Determine if this is the final reminder
-                        is_final = i == len(REMINDER_TIMES) - 1
-                        reminder_prefix = "**Final Reminder:**" if is_final else "**Reminder:**"
-
-                        try:
-                            await member.send(
-                                f"{reminder_prefix} You have **{hours_left:.0f} hours** remaining to introduce yourself in {intro_channel.mention}. "
-                                f"Please post your introduction to avoid being removed from the server."
-                            )
-                            print(f"Guild {guild_id}: Sent {reminder_hour}-hour reminder to {member.name}")
-                            user_data[reminder_key] = True
-                            save_needed = True
-                            reminder_sent_this_cycle = True
-
-                            # Log to mod channel
-                            await log_to_mod_channel(
-                                guild_id,
-                                f"⏰ Sent {reminder_hour}h reminder to **{member.mention}** ({hours_left:.0f}h remaining)",
-                                discord.Color.orange()
-                            )
-                        except discord.Forbidden:
-                            print(f"Guild {guild_id}: Could not send {reminder_hour}-hour reminder to {member.name}")
-
-                        # Stop after sending one reminder
+            # Check if it's time for this reminder
+            if hours_elapsed >= reminder_hour and not reminder_sent_this_cycle:
+                # For catch-up: only send the LAST unsent reminder, skip earlier ones
+                # Check if there are later reminders we should send instead
+                should_skip = False
+                for j in range(i + 1, len(REMINDER_TIMES)):
+                    later_reminder_hour = REMINDER_TIMES[j]
+                    if hours_elapsed >= later_reminder_hour:
+                        # There's a later reminder we should send instead
+                        should_skip = True
+                        # Mark this one as sent so we don't try again
+                        entry.reminded |= reminder_bit
+                        reminded.add(user_id)
+                        check_logger.info(
+                            "Skipped %d-hour reminder for %s (sending later reminder instead)", reminder_hour, member.name,
+                            extra=log_fields('reminder_skipped', guild_id, user_id, reminder=f'{reminder_hour}h')
+                        )
                         break
 
-            # If grace period has passed, kick the member (with safety checks)
-            if hours_elapsed >= member_grace_hours:
-                # Check if kicking is enabled
-                if not ENABLE_KICKING:
-                    print(f"[{guild.name}] [SAFETY] Would kick {member.name} but ENABLE_KICKING=False")
-                    await log_to_mod_channel(
-                        guild_id,
-                        f"🛡️ **SAFETY MODE**: Would kick **{member.mention}** but kicking is disabled. Set ENABLE_KICKING=True to allow kicks.",
-                        discord.Color.gold()
-                    )
-                    continue
-
-                to_remove.append(user_id)
+                if not should_skip:
+                    hours_left = member_grace_hours - hours_elapsed
 
-                # Dry run mode - log but don't actually kick
-                if DRY_RUN_MODE:
-                    print(f"[{guild.name}] [DRY RUN] Would kick {member.name} for not introducing themselves")
-                    await log_to_mod_channel(
-                        guild_id,
-                        f"🔍 **DRY RUN**: Would kick **{member.mention}** ({member_grace_hours}h expired). Set DRY_RUN_MODE=False to enable real kicks.",
-                        discord.Color.orange()
+                    # Determine if this is the final reminder
+                    is_final = i == len(REMINDER_TIMES) - 1
+                    reminder_prefix = "**Final Reminder:**" if is_final else "**Reminder:**"
+
+                    queue_dm(
+                        guild_id, member.id,
+                        f"{reminder_prefix} You have **{hours_left:.0f} hours** remaining to introduce yourself in {intro_channel.mention}. "
+                        f"Please post your introduction to avoid being removed from the server.",
+                        status_key=f'reminder_{reminder_hour}',
+                        mod_log=(
+                            f"⏰ Sent {reminder_hour}h reminder to **{member.mention}** ({hours_left:.0f}h remaining)",
+                            discord.Color.orange(),
+                            'reminders'
+                        )
                     )
-                    continue
+                    check_logger.info("Queued %d-hour reminder for %s", reminder_hour, member.name, extra=log_fields('reminder_queued', guild_id, user_id, reminder=f'{reminder_hour}h'))
+                    entry.reminded |= reminder_bit
+                    reminded.add(user_id)
+                    reminder_sent_this_cycle = True
+
+                    # Stop after sending one reminder
+                    break
+
+        # If grace period has passed, kick the member (with safety checks)
+        if hours_elapsed >= member_grace_hours:
+            # Check if kicking is enabled
+            if not ENABLE_KICKING:
+                check_logger.info("[SAFETY] Would kick %s but ENABLE_KICKING=False", member.name, extra=log_fields('kick_skipped', guild_id, user_id, mode='safety'))
+                log_to_mod_channel(
+                    guild_id,
+                    f"🛡️ **SAFETY MODE**: Would kick **{member.mention}** but kicking is disabled. Set ENABLE_KICKING=True to allow kicks.",
+                    discord.Color.gold(),
+                    kind='kick notices'
+                )
+                reschedule_pending_member(guild_id, user_id, entry, member_grace_hours, current_time)
+                continue
 
-                try:
-                    # Log to mod channel BEFORE kicking (so we can mention them)
-                    await log_to_mod_channel(
-                        guild_id,
-                        f"⚠️ About to kick **{member.mention}** for not introducing themselves within {member_grace_hours}h",
-                        discord.Color.red()
-                    )
+            to_remove[user_id] = 'kicked'
+
+            # Dry run mode - log but don't actually kick
+            if DRY_RUN_MODE:
+                to_remove[user_id] = 'dry_run_kick'
+                check_logger.info("[DRY RUN] Would kick %s for not introducing themselves", member.name, extra=log_fields('kick_skipped', guild_id, user_id, mode='dry_run'))
+                log_to_mod_channel(
+                    guild_id,
+                    f"🔍 **DRY RUN**: Would kick **{member.mention}** ({member_grace_hours}h expired). Set DRY_RUN_MODE=False to enable real kicks.",
+                    discord.Color.orange(),
+                    kind='kick notices'
+                )
+                continue
 
-                    # Send final DM before kicking
-                    try:
-                        await member.send(
-                            f"You have been removed from the server for not posting an introduction "
-                            f"in {intro_channel.mention} within {member_grace_hours} hours."
-                        )
-                    except:
-                        pass
+            try:
+                # Log to mod channel BEFORE kicking (so we can mention them)
+                log_to_mod_channel(
+                    guild_id,
+                    f"⚠️ About to kick **{member.mention}** for not introducing themselves within {member_grace_hours}h",
+                    discord.Color.red(),
+                    kind='kicks'
+                )
 
+                # Send final DM before kicking (jumps the DM queue; give up waiting after a while)
+                kick_notice = queue_dm(
+                    guild_id, member.id,
+                    f"You have been removed from the server for not posting an introduction "
+                    f"in {intro_channel.mention} within {member_grace_hours} hours.",
+                    priority=DM_PRIORITY_URGENT
+                )
+                await asyncio.wait({kick_notice}, timeout=DM_KICK_NOTICE_TIMEOUT_SECONDS)
+
+                with observe_duration('allo_discord_api_seconds', call='kick'):
                     await member.kick(reason=f"Did not post introduction within {member_grace_hours} hours")
-                    print(f"[{guild.name}] Kicked {member.name} for not introducing themselves")
+                inc_counter('allo_kicks_total', guild=guild_id)
+                check_logger.info("Kicked %s for not introducing themselves", member.name, extra=log_fields('member_kicked', guild_id, user_id))
+
+                # Log successful kick
+                log_to_mod_channel(
+                    guild_id,
+                    f"❌ Kicked **{member.name}** (ID: {member.id}) for not introducing themselves",
+                    discord.Color.dark_red(),
+                    kind='kicks'
+                )
 
-                    # Log successful kick
-                    await log_to_mod_channel(
-                        guild_id,
-                        f"❌ Kicked **{member.name}** (ID: {member.id}) for not introducing themselves",
-                        discord.Color.dark_red()
-                    )
+            except discord.Forbidden:
+                to_remove[user_id] = 'kick_failed'
+                check_logger.warning("Missing permissions to kick %s", member.name, extra=log_fields('kick_forbidden', guild_id, user_id))
+                log_to_mod_channel(
+                    guild_id,
+                    f"⚠️ Failed to kick **{member.mention}** - missing permissions",
+                    discord.Color.red(),
+                    kind='kicks'
+                )
+            except Exception as e:
+                to_remove[user_id] = 'kick_failed'
+                check_logger.error("Error kicking %s: %s", member.name, e, extra=log_fields('kick_failed', guild_id, user_id))
+                log_to_mod_channel(
+                    guild_id,
+                    f"⚠️ Error kicking **{member.mention}**: {e}",
+                    discord.Color.red(),
+                    kind='kicks'
+                )
+            continue
 
-                except discord.Forbidden:
-                    print(f"[{guild.name}] Missing permissions to kick {member.name}")
-                    await log_to_mod_channel(
-                        guild_id,
-                        f"⚠️ Failed to kick **{member.mention}** - missing permissions",
-                        discord.Color.red()
-                    )
-                except Exception as e:
-                    print(f"[{guild.name}] Error kicking {member.name}: {e}")
-                    await log_to_mod_channel(
-                        guild_id,
-                        f"⚠️ Error kicking **{member.mention}**: {e}",
-                        discord.Color.red()
-                    )
+        reschedule_pending_member(guild_id, user_id, entry, member_grace_hours, current_time)
 
-        # Remove kicked members from pending list
-        for user_id in to_remove:
-            del pending_members[user_id]
+    # Remove kicked members from pending list
+    for user_id, reason in to_remove.items():
+        pending_members.pop(user_id, None)
+        unschedule_pending_member(guild_id, user_id)
+        mark_guild_dirty(guild_id, 'pending', [user_id], reason=reason)
+        if reason in ('dry_run_kick', 'kick_failed'):
+            mark_untracked(guild_id, user_id)  # Still in the server, no longer tracked
 
-        if to_remove or save_needed:
-            save_guild_pending(guild_id, pending_members)
+    reminded.difference_update(to_remove)
+    if reminded:
+        mark_guild_dirty(guild_id, 'pending', reminded, reason='reminded')
+
+def reschedule_pending_member(guild_id, user_id, entry, grace_hours, current_time):
+    """Reschedule a member after processing; anything still due waits for the next check cycle"""
+    due = get_next_due_time(entry, grace_hours)
+    if due <= current_time:
+        # Held-back reminder or safety-mode kick - retry on the old check cadence
+        due = current_time + CHECK_INTERVAL_MINUTES * 60
+    schedule_at(guild_id, user_id, due)
 
 @check_introductions.before_loop
 async def before_check():
     """Wait until bot is ready before starting checks"""
     await bot.wait_until_ready()
 
+    # Loading a guild's data schedules its pending members
+    for guild in get_owned_guilds():
+        get_guild_data(guild.id)
+
 # Admin commands
 @bot.command(name='checkpending')
 @commands.has_permissions(administrator=True)
@@ -570,41 +2662,16 @@ async def check_pending(ctx, page: int = 1):
     guild_id = str(ctx.guild.id)
     guild_data = get_guild_data(guild_id)
     pending_members = guild_data['pending']
-    current_time = datetime.utcnow()
+    current_time = time.time()
 
     if not pending_members:
         await ctx.send("No members are pending introduction.")
         return
 
-    # Build list of pending members with their info
-    pending_list = []
-    for user_id, user_data in pending_members.items():
-        member = ctx.guild.get_member(int(user_id))
-        if member:
-            join_time = datetime.fromisoformat(user_data['join_time'])
-
-            # Calculate time remaining using deadline if available
-            if 'deadline' in user_data:
-                deadline = datetime.fromisoformat(user_data['deadline'])
-                time_until_deadline = deadline - current_time
-                hours_left = max(0, time_until_deadline.total_seconds() / 3600)
-            else:
-                time_left = timedelta(hours=GRACE_PERIOD_HOURS) - (current_time - join_time)
-                hours_left = max(0, time_left.total_seconds() / 3600)
-
-            # Show reminder status
-            status = []
-            for reminder_hour in REMINDER_TIMES:
-                reminder_key = f'reminded_{reminder_hour}'
-                if user_data.get(reminder_key, False):
-                    status.append(f"{reminder_hour}hr ✓")
-            status_str = f" ({', '.join(status)})" if status else ""
-
-            pending_list.append((member, hours_left, status_str))
-
-    # Pagination
+    # Pagination - order by deadline and slice before resolving, so only this page's
+    # members are looked up
     per_page = 25
-    total_pages = (len(pending_list) + per_page - 1) // per_page
+    total_pages = (len(pending_members) + per_page - 1) // per_page
     requested_page = page
     page = max(1, min(page, total_pages))
 
@@ -616,8 +2683,31 @@ async def check_pending(ctx, page: int = 1):
             await ctx.send(f"⚠️ Page {requested_page} doesn't exist (only {total_pages} page{'s' if total_pages > 1 else ''}). Showing page {total_pages} instead.")
 
     start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
-    page_members = pending_list[start_idx:end_idx]
+    page_entries = sorted(pending_members.items(), key=lambda item: item[1].get_deadline())[start_idx:start_idx + per_page]
+
+    # Build list of this page's members with their info
+    members, departed = await resolve_members(ctx.guild, [user_id for user_id, _ in page_entries])
+    page_members = []
+    for user_id, entry in page_entries:
+        member = members.get(user_id)
+        if member:
+            name = member.name
+        elif user_id in departed:
+            name = f"{user_id} (left the server)"
+        else:
+            name = f"{user_id} (lookup failed)"
+
+        # Calculate time remaining using deadline if available
+        hours_left = max(0, (entry.get_deadline() - current_time) / 3600)
+
+        # Show reminder status
+        status = []
+        for i, reminder_hour in enumerate(REMINDER_TIMES):
+            if entry.reminded & get_reminder_bit(i):
+                status.append(f"{reminder_hour}hr ✓")
+        status_str = f" ({', '.join(status)})" if status else ""
+
+        page_members.append((name, hours_left, status_str))
 
     # Create embed
     title = "Pending Introductions"
@@ -626,13 +2716,13 @@ async def check_pending(ctx, page: int = 1):
 
     embed = discord.Embed(
         title=title,
-        description=f"{len(pending_list)} members pending introduction",
+        description=f"{len(pending_members)} members pending introduction",
         color=discord.Color.orange()
     )
 
-    for member, hours_left, status_str in page_members:
+    for name, hours_left, status_str in page_members:
         embed.add_field(
-            name=member.name,
+            name=name,
             value=f"{hours_left:.1f} hours remaining{status_str}",
             inline=False
         )
@@ -655,6 +2745,118 @@ async def set_intro_channel(ctx, channel: discord.TextChannel):
 
     await ctx.send(f"✅ Introductions channel set to {channel.mention} (saved)")
 
+@bot.command(name='introrules')
+@commands.has_permissions(administrator=True)
+async def set_intro_rules(ctx, setting: str = None, *, value: str = None):
+    """Show or change this server's intro requirements (minimum length, required keywords)"""
+    guild_id = str(ctx.guild.id)
+
+    # Update cached config in-place to avoid race conditions
+    guild_data = get_guild_data(guild_id)
+    config = guild_data['config']
+
+    if setting is not None:
+        rules = dict(config.get('intro_rules', {}))
+        if setting == 'minlength' and value is not None and value.isdigit():
+            rules['min_length'] = int(value)
+        elif setting == 'keywords' and value is not None:
+            rules['keywords'] = [] if value.lower() == 'none' else [keyword.strip() for keyword in value.split(',') if keyword.strip()]
+        elif setting == 'match' and value in ('words', 'substring'):
+            rules['whole_words'] = value == 'words'
+        elif setting == 'reset':
+            rules = {}
+        else:
+            await ctx.send(
+                "Usage: `!introrules minlength <chars>` (0 = off), `!introrules keywords name, age, hobbies` "
+                "(`none` = off), `!introrules match words|substring` or `!introrules reset` (global defaults)"
+            )
+            return
+
+        if rules:
+            config['intro_rules'] = rules
+        else:
+            config.pop('intro_rules', None)
+        save_guild_config(guild_id, config)
+
+    compiled = get_intro_rules(guild_id, config)
+    summary = (
+        f"Min length: **{compiled.min_length or 'off'}**\n"
+        f"Keywords: **{', '.join(compiled.keywords) or 'none'}**\n"
+        f"Matching: **{'whole words' if compiled.whole_words else 'substring'}**"
+    )
+    if setting is None:
+        await ctx.send(f"Intro requirements for this server:\n{summary}")
+        return
+
+    await ctx.send(f"✅ Intro requirements updated (saved):\n{summary}")
+    log_to_mod_channel(
+        guild_id,
+        f"📏 Intro requirements changed by **{ctx.author.mention}**: {summary.replace(chr(10), ' • ')}",
+        discord.Color.green()
+    )
+
+@bot.command(name='rolebackfill')
+@commands.has_permissions(administrator=True)
+async def role_backfill(ctx, action: str = None):
+    """Give the welcome role to members who introduced before it was set (start/stop/status)"""
+    guild_id = str(ctx.guild.id)
+    state = get_guild_data(guild_id)['state']
+    job = state.get('role_backfill')
+
+    if action == 'start':
+        if job and 'finished' not in job:
+            await ctx.send("A welcome role backfill is already running. Use `!rolebackfill` to see its progress.")
+            return
+        welcome_role_id = get_guild_data(guild_id)['config'].get('welcome_role_id', 0)
+        role = ctx.guild.get_role(welcome_role_id) if welcome_role_id else None
+        if role is None:
+            await ctx.send("Please set the welcome role first using !setwelcomerole")
+            return
+        if role >= ctx.guild.me.top_role:
+            await ctx.send(f"{role.mention} is above my highest role, so I can't assign it. Move my role above it first.")
+            return
+
+        await ctx.send("Finding introduced members without the welcome role...")
+        job = await create_role_backfill(ctx.guild, role)
+        await ctx.send(
+            f"🎭 Assigning {role.mention} to {len(job['queue'])} members in the background "
+            f"({job['skipped']} skipped - their top role is above mine). Use `!rolebackfill` to follow progress."
+        )
+        log_to_mod_channel(
+            guild_id,
+            f"🎭 **{ctx.author.mention}** started a welcome role backfill for {len(job['queue'])} members",
+            discord.Color.blue()
+        )
+        return
+
+    if action == 'stop':
+        if not job or 'finished' in job:
+            await ctx.send("No welcome role backfill is running.")
+            return
+        finish_role_backfill(guild_id, job, f"stopped by {ctx.author.name}")
+        await ctx.send("⏹️ Welcome role backfill stopped.")
+        return
+
+    if action is not None:
+        await ctx.send("Usage: `!rolebackfill` (status), `!rolebackfill start` or `!rolebackfill stop`")
+        return
+
+    if not job:
+        await ctx.send("No welcome role backfill has been run. Use `!rolebackfill start` to give the welcome role to members who already introduced.")
+        return
+
+    embed = discord.Embed(title="Welcome Role Backfill", color=discord.Color.blue())
+    embed.add_field(name="✅ Assigned", value=str(job['assigned']), inline=True)
+    embed.add_field(name="⏭️ Skipped", value=str(job['skipped']), inline=True)
+    embed.add_field(name="🚪 Left", value=str(job.get('left', 0)), inline=True)
+    embed.add_field(name="⚠️ Failed", value=str(job['failed']), inline=True)
+    embed.add_field(name="⏳ Waiting", value=str(len(job['queue'])), inline=True)
+    status = f"Started <t:{job['started']}:R>"
+    if 'finished' in job:
+        status += f" • {job['result']} <t:{job['finished']}:R>"
+    embed.add_field(name="Status", value=status, inline=False)
+    await ctx.send(embed=embed)
+
 @bot.command(name='setmodlog')
 @commands.has_permissions(administrator=True)
 async def set_mod_log(ctx, channel: discord.TextChannel):
@@ -667,7 +2869,7 @@ async def set_mod_log(ctx, channel: discord.TextChannel):
     save_guild_config(guild_id, guild_data['config'])
 
     await ctx.send(f"✅ Mod log channel set to {channel.mention} (saved)")
-    await log_to_mod_channel(
+    log_to_mod_channel(
         guild_id,
         f"✅ Mod logging enabled by **{ctx.author.mention}**",
         discord.Color.green()
@@ -684,8 +2886,11 @@ async def set_welcome_role(ctx, role: discord.Role):
     guild_data['config']['welcome_role_id'] = role.id
     save_guild_config(guild_id, guild_data['config'])
 
-    await ctx.send(f"✅ Welcome role set to {role.mention} (saved)")
-    await log_to_mod_channel(
+    await ctx.send(
+        f"✅ Welcome role set to {role.mention} (saved)\n"
+        f"Members who introduced before now don't have it yet - use `!rolebackfill start` to give it to them."
+    )
+    log_to_mod_channel(
         guild_id,
         f"✅ Welcome role set to {role.mention} by **{ctx.author.mention}**",
         discord.Color.green()
@@ -701,17 +2906,21 @@ async def mark_introduced(ctx, member: discord.Member):
     pending_members = guild_data['pending']
     introduced_members = guild_data['introduced']
 
-    user_id = str(member.id)
+    user_id = member.id
 
     # Add to introduced cache
-    introduced_members.add(member.id)
-    save_guild_introduced(guild_id, introduced_members)
+    if member.id not in introduced_members:
+        introduced_members.add(member.id)
+        adjust_member_counts(guild_id, introduced=1)
+    mark_guild_dirty(guild_id, 'introduced', [member.id])
+    unmark_untracked(guild_id, [member.id])
 
     # Remove from pending if tracked
     was_pending = user_id in pending_members
     if was_pending:
         del pending_members[user_id]
-        save_guild_pending(guild_id, pending_members)
+        unschedule_pending_member(guild_id, user_id)
+        mark_guild_dirty(guild_id, 'pending', [user_id], reason='introduced')
 
     # Assign welcome role if configured
     welcome_role_id = config.get('welcome_role_id', 0)
@@ -726,7 +2935,7 @@ async def mark_introduced(ctx, member: discord.Member):
     status = "and removed from tracking" if was_pending else "(was not being tracked)"
     await ctx.send(f"✅ Marked {member.mention} as introduced {status}")
 
-    await log_to_mod_channel(
+    log_to_mod_channel(
         guild_id,
         f"✅ **{ctx.author.mention}** manually marked **{member.mention}** as introduced",
         discord.Color.green()
@@ -740,18 +2949,21 @@ async def untrack_member(ctx, member: discord.Member):
     guild_data = get_guild_data(guild_id)
     pending_members = guild_data['pending']
 
-    user_id = str(member.id)
+    user_id = member.id
 
     if user_id not in pending_members:
         await ctx.send(f"{member.mention} is not currently being tracked.")
         return
 
     del pending_members[user_id]
-    save_guild_pending(guild_id, pending_members)
+    unschedule_pending_member(guild_id, user_id)
+    mark_guild_dirty(guild_id, 'pending', [user_id], reason='untracked')
+    if not member.bot and user_id not in guild_data['introduced']:
+        mark_untracked(guild_id, user_id)
 
     await ctx.send(f"✅ Stopped tracking {member.mention} (they will not be kicked)")
 
-    await log_to_mod_channel(
+    log_to_mod_channel(
         guild_id,
         f"⏸️ **{ctx.author.mention}** stopped tracking **{member.mention}**",
         discord.Color.blue()
@@ -769,15 +2981,27 @@ async def reset_cache(ctx):
         await ctx.send("Please set the introductions channel first using !setintrochannel")
         return
 
+    if guild_id in warming_guilds or guild_id in history_scan_progress:
+        await ctx.send("A history scan for this server is still running. Please try again once it finishes.")
+        return
+
     await ctx.send("Rebuilding cache from intro channel history...")
 
-    # Clear current cache
+    # Clear current cache and the scan checkpoint so the whole history is read again
     guild_data = get_guild_data(guild_id)
     introduced_members = guild_data['introduced']
     introduced_members.clear()
+    mark_guild_dirty(guild_id, 'introduced')
+    untracked_members.pop(guild_id, None)  # Everyone is untracked again until the rescan - rebuilt on next use
+    member_counts.pop(guild_id, None)  # Likewise recounted on the next !stats
+    guild_data['state'].pop('last_scanned_message_id', None)
+    guild_data['state'].pop('history_cursor', None)
+    guild_data['state'].pop('reaction_backlog', None)  # The rescan queues whatever still needs a ✅
+    mark_guild_dirty(guild_id, 'state')
 
     # Rescan
-    await scan_intro_channel_history(guild_id, intro_channel_id)
+    with hold_guild_data(guild_id), observe_duration('allo_history_scan_seconds'), profile_section('scan'):
+        await scan_intro_channel_history(guild_id, intro_channel_id)
 
     # Reload to get updated count
     guild_data = get_guild_data(guild_id)
@@ -787,42 +3011,50 @@ async def reset_cache(ctx):
 
 @bot.command(name='cleanup')
 @commands.has_permissions(administrator=True)
-async def cleanup_tracking(ctx):
-    """Remove members who left the server from tracking lists"""
+async def cleanup_tracking(ctx, mode: str = None):
+    """Remove members who left the server from tracking lists
+
+    Departures are handled as they happen, so this only compacts the introduced entries still
+    waiting for the background compactor. `!cleanup full` also sweeps every tracked member
+    against the member list, for members who left while the bot was offline.
+    """
     guild_id = str(ctx.guild.id)
-    guild_data = get_guild_data(guild_id)
-    pending_members = guild_data['pending']
-    introduced_members = guild_data['introduced']
+    # Held across the awaits below so the changes land in the cached data that gets saved
+    with hold_guild_data(guild_id) as guild_data:
+        pending_members = guild_data['pending']
+        introduced_members = guild_data['introduced']
 
-    # Clean up pending members
-    pending_removed = []
-    for user_id in list(pending_members.keys()):
-        member = ctx.guild.get_member(int(user_id))
-        if not member:
-            pending_removed.append(user_id)
-            del pending_members[user_id]
+        introduced_removed = compact_tombstones(guild_id)
 
-    if pending_removed:
-        save_guild_pending(guild_id, pending_members)
+        pending_removed = []
+        if mode == 'full':
+            await ensure_member_cache(ctx.guild)
+            for user_id in list(pending_members.keys()):
+                member = ctx.guild.get_member(user_id)
+                if not member:
+                    pending_removed.append(user_id)
+                    del pending_members[user_id]
+                    unschedule_pending_member(guild_id, user_id)
 
-    # Clean up introduced members
-    current_member_ids = {m.id for m in ctx.guild.members}
-    introduced_removed = []
-    for user_id in list(introduced_members):
-        if user_id not in current_member_ids:
-            introduced_removed.append(user_id)
-            introduced_members.remove(user_id)
+            if pending_removed:
+                mark_guild_dirty(guild_id, 'pending', pending_removed, reason='left')
 
-    if introduced_removed:
-        save_guild_introduced(guild_id, introduced_members)
+            current_member_ids = {m.id for m in ctx.guild.members}
+            swept = introduced_members.retain(current_member_ids)
+            if swept:
+                mark_guild_dirty(guild_id, 'introduced', swept)
+            introduced_removed += len(swept)
 
-    # Report
-    embed = discord.Embed(title="Cleanup Complete", color=discord.Color.green())
-    embed.add_field(name="Pending List", value=f"Removed {len(pending_removed)} members who left", inline=True)
-    embed.add_field(name="Introduced List", value=f"Removed {len(introduced_removed)} members who left", inline=True)
-    embed.add_field(name="Total Cleaned", value=str(len(pending_removed) + len(introduced_removed)), inline=True)
+        # Report
+        embed = discord.Embed(title="Cleanup Complete", color=discord.Color.green())
+        pending_text = f"Removed {len(pending_removed)} members who left" if mode == 'full' else "Members are removed as they leave"
+        embed.add_field(name="Pending List", value=pending_text, inline=True)
+        embed.add_field(name="Introduced List", value=f"Removed {introduced_removed} members who left", inline=True)
+        embed.add_field(name="Total Cleaned", value=str(len(pending_removed) + introduced_removed), inline=True)
+        if mode != 'full':
+            embed.set_footer(text="Bot was offline while members left? Use !cleanup full")
 
-    await ctx.send(embed=embed)
+        await ctx.send(embed=embed)
 
 @bot.command(name='stats')
 @commands.has_permissions(administrator=True)
@@ -832,34 +3064,20 @@ async def show_stats(ctx):
     guild_data = get_guild_data(guild_id)
     config = guild_data['config']
     pending_members = guild_data['pending']
-    introduced_members = guild_data['introduced']
 
     embed = discord.Embed(title="Introduction Bot Statistics", color=discord.Color.blue())
 
-    # Clean up pending members who left the server
-    to_remove = []
-    for user_id in pending_members.keys():
-        member = ctx.guild.get_member(int(user_id))
-        if not member:
-            to_remove.append(user_id)
-
-    for user_id in to_remove:
-        del pending_members[user_id]
-
-    if to_remove:
-        save_guild_pending(guild_id, pending_members)
-
-    # Pending members (still in server)
+    # Pending members (members who leave are dropped as they go)
     pending_count = len(pending_members)
     embed.add_field(name="📊 Pending Introductions", value=str(pending_count), inline=True)
 
-    # Introduced members (still in server)
-    current_member_ids = {m.id for m in ctx.guild.members if not m.bot}
-    introduced_in_server = len(introduced_members & current_member_ids)
+    # Introduced members (still in server) and total members - kept current by events
+    await ensure_member_cache(ctx.guild)
+    counts = get_member_counts(ctx.guild)
+    introduced_in_server = counts['introduced']
     embed.add_field(name="✅ Introduced Members", value=str(introduced_in_server), inline=True)
 
-    # Total members in server
-    total_members = len([m for m in ctx.guild.members if not m.bot])
+    total_members = counts['humans']
     embed.add_field(name="👥 Total Members", value=str(total_members), inline=True)
 
     # Show breakdown
@@ -888,11 +3106,12 @@ async def show_stats(ctx):
         role = ctx.guild.get_role(welcome_role_id)
         config_text += f"Welcome Role: {role.mention if role else 'Not found'}\n"
 
-    if MIN_INTRO_LENGTH > 0:
-        config_text += f"Min Intro Length: {MIN_INTRO_LENGTH} chars\n"
+    rules = get_intro_rules(guild_id, config)
+    if rules.min_length > 0:
+        config_text += f"Min Intro Length: {rules.min_length} chars\n"
 
-    if REQUIRE_KEYWORDS:
-        config_text += f"Required Keywords: {', '.join(REQUIRE_KEYWORDS)}\n"
+    if rules.keywords:
+        config_text += f"Required Keywords: {', '.join(rules.keywords)}{' (whole words)' if rules.whole_words else ''}\n"
 
     embed.add_field(name="⚙️ Configuration", value=config_text, inline=False)
 
@@ -902,6 +3121,122 @@ async def show_stats(ctx):
 
     await ctx.send(embed=embed)
 
+@bot.command(name='botstatus')
+@commands.has_permissions(administrator=True)
+async def show_bot_status(ctx):
+    """Show internal bot health (persistence, scheduler, guild cache, startup scans, shards, reaction backfill, departures, handler latency)"""
+    embed = discord.Embed(title="Allo Bot Status", color=discord.Color.blue())
+
+    persistence_text = (
+        f"Save requests: {persistence_stats['save_requests']}\n"
+        f"Writes: {persistence_stats['writes']}\n"
+        f"Coalesced: {persistence_stats['coalesced']}\n"
+        f"Journal compactions: {persistence_stats['compactions']}\n"
+        f"Dirty guilds: {len(dirty_guilds)}"
+    )
+    if persistence_stats['write_errors']:
+        persistence_text += f"\nWrite errors: {persistence_stats['write_errors']}"
+    embed.add_field(name="💾 Persistence", value=persistence_text, inline=True)
+
+    next_due = peek_next_due()
+    scheduler_text = f"Scheduled members: {len(pending_schedule_due)}\n"
+    scheduler_text += f"Next event: <t:{int(next_due)}:R>" if next_due is not None else "Next event: none"
+    embed.add_field(name="⏰ Scheduler", value=scheduler_text, inline=True)
+
+    cache_text = (
+        f"Cached guilds: {len(guild_data_cache)}/{GUILD_CACHE_MAX_GUILDS}\n"
+        f"Hits: {guild_cache_stats['hits']}\n"
+        f"Misses: {guild_cache_stats['misses']}\n"
+        f"Evictions: {guild_cache_stats['evictions']}"
+    )
+    embed.add_field(name="🗂️ Guild Cache", value=cache_text, inline=True)
+
+    warming_text = f"{len(warming_guilds)} of {len(bot.guilds)} guilds still scanning" if warming_guilds else "All guilds scanned"
+    embed.add_field(name="🔄 Startup Scans", value=warming_text, inline=True)
+
+    if SHARD_COUNT:
+        shard_text = "\n".join(
+            f"{'🟢' if health['connected'] else '🔴'} Shard {shard_id}: {health['guilds']} guilds, "
+            f"{health['latency'] * 1000:.0f}ms, {health['disconnects']} disconnects, {health['resumes']} resumes"
+            for shard_id, health in sorted(get_shard_health().items())
+        )
+        embed.add_field(name=f"🧩 Shards (this process, of {SHARD_COUNT})", value=shard_text, inline=False)
+
+    reaction_text = (
+        f"Queued: {get_reaction_backlog_size()}\n"
+        f"Added: {reaction_stats['added']}\n"
+        f"Failed: {reaction_stats['failed']}\n"
+        f"Budget: {REACTIONS_PER_MINUTE}/min"
+    )
+    embed.add_field(name="✅ Reaction Backfill", value=reaction_text, inline=True)
+
+    departure_text = (
+        f"Left: {departure_stats['left']}\n"
+        f"Pending dropped: {departure_stats['pending_dropped']}\n"
+        f"Tombstones waiting: {sum(len(departed) for departed in tombstones.values())}\n"
+        f"Compacted: {departure_stats['tombstones_compacted']}"
+    )
+    embed.add_field(name="🚪 Departures", value=departure_text, inline=True)
+
+    if history_scan_progress:
+        now = time.perf_counter()
+        scan_text = "\n".join(
+            f"{bot.get_guild(int(guild_id)) or guild_id}: {progress['messages']} messages "
+            f"({progress['messages'] / max(now - progress['started'], 1e-9):.0f} msg/s)"
+            for guild_id, progress in history_scan_progress.items()
+        )
+        embed.add_field(name="📜 History Scans", value=scan_text, inline=False)
+
+    latency_text = "\n".join(
+        f"{event}: {stats['total_ms'] / stats['count']:.2f}ms avg, {stats['max_ms']:.1f}ms max ({stats['count']})"
+        for event, stats in sorted(event_latency_stats.items())
+    ) or "No events yet"
+    embed.add_field(name="⏱️ Handler Latency", value=latency_text, inline=False)
+
+    await ctx.send(embed=embed)
+
+@bot.command(name='profile')
+@commands.has_permissions(administrator=True)
+async def profile_command(ctx, target: str = None, passes: int = 1):
+    """Profile the next check loop passes or the next history scan (cProfile + tracemalloc)"""
+    if target == 'cancel':
+        await ctx.send(cancel_profile())
+        return
+
+    if target not in PROFILE_TARGETS:
+        await ctx.send("Please choose what to profile.\nExample: `!profile checks 5` (next 5 check loop passes), `!profile scan` (next history scan, e.g. `!resetcache`) or `!profile cancel`")
+        return
+
+    if target == 'scan':
+        passes = 1
+    elif passes < 1 or passes > 100:
+        await ctx.send("Number of passes must be between 1 and 100.")
+        return
+
+    error = request_profile(target, passes, str(ctx.guild.id))
+    if error:
+        await ctx.send(error)
+        return
+
+    what = f"next {passes} check loop pass(es)" if target == 'checks' else "next history scan"
+    await ctx.send(f"🔬 Profiling the {what}. Results are written to `{PROFILE_DIR}/` and summarised in the mod log.")
+
+@bot.command(name='dmstatus')
+@commands.has_permissions(administrator=True)
+async def show_dm_status(ctx):
+    """Show delivery progress of welcome/reminder DMs for this server"""
+    guild_stats = dm_stats.get(str(ctx.guild.id), {'queued': 0, 'sent': 0, 'forbidden': 0, 'failed': 0})
+    delivered = guild_stats['sent'] + guild_stats['forbidden'] + guild_stats['failed']
+
+    embed = discord.Embed(title="DM Delivery", color=discord.Color.blue())
+    embed.add_field(name="📨 Sent", value=str(guild_stats['sent']), inline=True)
+    embed.add_field(name="🚫 DMs Closed", value=str(guild_stats['forbidden']), inline=True)
+    embed.add_field(name="⚠️ Failed", value=str(guild_stats['failed']), inline=True)
+    embed.add_field(name="⏳ Waiting", value=str(guild_stats['queued'] - delivered), inline=True)
+    embed.set_footer(text=f"{dm_queue.qsize()} DMs queued across all servers • counts reset when the bot restarts")
+
+    await ctx.send(embed=embed)
+
 @bot.command(name='allo')
 async def allo_test(ctx):
     """Test command to verify bot is responding"""
@@ -927,7 +3262,9 @@ async def show_help(ctx):
     setup_cmds = (
         "`!setintrochannel #channel` - Set introductions channel\n"
         "`!setmodlog #channel` - Set mod log channel\n"
-        "`!setwelcomerole @role` - Set role to assign after intro"
+        "`!setwelcomerole @role` - Set role to assign after intro\n"
+        "`!introrules [minlength|keywords|match|reset] ...` - Set intro requirements\n"
+        "`!rolebackfill [start|stop]` - Give the welcome role to members who already introduced"
     )
     embed.add_field(name="⚙️ Setup Commands (Admin)", value=setup_cmds, inline=False)
 
@@ -936,7 +3273,10 @@ async def show_help(ctx):
         "`!scanexisting [page]` - Find untracked members (not being tracked yet)\n"
         "`!trackexisting <hours>` - Add untracked members to tracking list\n"
         "`!checkpending [page]` - View tracked members (currently being tracked)\n"
-        "`!stats` - View bot statistics and config"
+        "`!dmstatus` - View welcome/reminder DM delivery progress\n"
+        "`!stats` - View bot statistics and config\n"
+        "`!botstatus` - View internal bot health (storage, scheduler)\n"
+        "`!profile <checks [passes]|scan>` - Profile the check loop or the next history scan"
     )
     embed.add_field(name="📊 Management Commands (Admin)", value=manage_cmds, inline=False)
 
@@ -951,7 +3291,7 @@ async def show_help(ctx):
     override_cmds = (
         "`!markintroduced @user` - Manually mark user as introduced\n"
         "`!untrack @user` - Stop tracking without kicking\n"
-        "`!cleanup` - Remove left members from tracking\n"
+        "`!cleanup [full]` - Compact left members now (`full` also sweeps for offline departures)\n"
         "`!resetcache` - Rebuild intro cache from history"
     )
     embed.add_field(name="🔧 Override Commands (Admin)", value=override_cmds, inline=False)
@@ -977,8 +3317,6 @@ async def scan_existing(ctx, page: int = 1):
     guild_id = str(ctx.guild.id)
     guild_data = get_guild_data(guild_id)
     config = guild_data['config']
-    pending_members = guild_data['pending']
-    introduced_members = guild_data['introduced']
 
     intro_channel_id = config.get('intro_channel_id', 0)
     if intro_channel_id == 0:
@@ -992,14 +3330,9 @@ async def scan_existing(ctx, page: int = 1):
         await ctx.send("Could not find the introductions channel.")
         return
 
-    # Use cached introduced_members (already loaded from persistent storage)
-    # Find members who haven't introduced themselves
-    unintroduced = []
-    for member in ctx.guild.members:
-        if member.bot:
-            continue
-        if member.id not in introduced_members and str(member.id) not in pending_members:
-            unintroduced.append(member)
+    # Members who haven't introduced themselves and aren't tracked (kept up to date by events)
+    await ensure_member_cache(ctx.guild)
+    unintroduced = get_untracked_members(ctx.guild)
 
     if not unintroduced:
         await ctx.send("All existing members have posted introductions!")
@@ -1020,7 +3353,8 @@ async def scan_existing(ctx, page: int = 1):
 
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
-    page_members = unintroduced[start_idx:end_idx]
+    page_members = [ctx.guild.get_member(user_id) for user_id in islice(unintroduced, start_idx, end_idx)]
+    page_members = [member for member in page_members if member is not None]
 
     # Create embed showing results
     title = "Unintroduced Existing Members"
@@ -1053,84 +3387,90 @@ async def scan_existing(ctx, page: int = 1):
 async def track_existing(ctx, grace_hours: int = None):
     """Start tracking existing members who haven't introduced themselves"""
     guild_id = str(ctx.guild.id)
-    guild_data = get_guild_data(guild_id)
-    config = guild_data['config']
-    pending_members = guild_data['pending']
-    introduced_members = guild_data['introduced']
-
-    intro_channel_id = config.get('intro_channel_id', 0)
-    if intro_channel_id == 0:
-        await ctx.send("Please set the introductions channel first using !setintrochannel")
-        return
+    # Held across the awaits below so the changes land in the cached data that gets saved
+    with hold_guild_data(guild_id) as guild_data:
+        config = guild_data['config']
+        pending_members = guild_data['pending']
 
-    if grace_hours is None:
-        await ctx.send(f"Please specify how many hours to give them.\nExample: `!trackexisting 72`")
-        return
+        intro_channel_id = config.get('intro_channel_id', 0)
+        if intro_channel_id == 0:
+            await ctx.send("Please set the introductions channel first using !setintrochannel")
+            return
 
-    if grace_hours < 1 or grace_hours > 168:
-        await ctx.send("Grace period must be between 1 and 168 hours (1 week).")
-        return
+        if grace_hours is None:
+            await ctx.send(f"Please specify how many hours to give them.\nExample: `!trackexisting 72`")
+            return
 
-    await ctx.send("Adding unintroduced members to tracking list...")
+        if grace_hours < 1 or grace_hours > 168:
+            await ctx.send("Grace period must be between 1 and 168 hours (1 week).")
+            return
 
-    intro_channel = bot.get_channel(intro_channel_id)
-    if not intro_channel:
-        await ctx.send("Could not find the introductions channel.")
-        return
+        await ctx.send("Adding unintroduced members to tracking list...")
 
-    # Use cached introduced_members (already loaded from persistent storage)
-    # Add unintroduced members to tracking
-    added_count = 0
-    current_time = datetime.utcnow()
-    deadline = current_time + timedelta(hours=grace_hours)
+        intro_channel = bot.get_channel(intro_channel_id)
+        if not intro_channel:
+            await ctx.send("Could not find the introductions channel.")
+            return
 
-    for member in ctx.guild.members:
-        if member.bot:
-            continue
-        if member.id not in introduced_members and str(member.id) not in pending_members:
-            # Initialize with dynamic reminder keys based on REMINDER_TIMES
-            # Store actual join_time and a deadline for when they'll be kicked
-            reminder_data = {
-                'join_time': current_time.isoformat(),
-                'deadline': deadline.isoformat()  # When they must intro by
-            }
-            for reminder_hour in REMINDER_TIMES:
-                reminder_data[f'reminded_{reminder_hour}'] = False
-
-            pending_members[str(member.id)] = reminder_data
-            added_count += 1
-
-            # Send them a DM notification (only if background checks are enabled)
-            if ENABLE_BACKGROUND_CHECKS:
-                try:
-                    await member.send(
+        # Add unintroduced members to tracking - everyone in the untracked index
+        added_count = 0
+        added_user_ids = []
+        join_ts = int(time.time())
+        deadline_ts = join_ts + grace_hours * 3600
+
+        await ensure_member_cache(ctx.guild)
+        untracked = get_untracked_members(ctx.guild)
+        for user_id in list(untracked):
+            member = ctx.guild.get_member(user_id)
+            if member is not None:
+                # Store the actual join time and a deadline for when they'll be kicked
+                entry = PendingEntry(join_ts, deadline_ts)
+                pending_members[member.id] = entry
+                schedule_pending_member(guild_id, member.id, entry)
+                added_user_ids.append(member.id)
+                added_count += 1
+
+                # Queue a DM notification (only if background checks are enabled) - delivered in the background
+                if ENABLE_BACKGROUND_CHECKS:
+                    queue_dm(
+                        guild_id, member.id,
                         f"Welcome to {ctx.guild.name}! To keep our community engaged, we ask everyone to introduce themselves in {intro_channel.mention}. "
-                        f"You have **{grace_hours} hours** to share a bit about yourself. Can't wait to hear from you!"
+                        f"You have **{grace_hours} hours** to share a bit about yourself. Can't wait to hear from you!",
+                        status_key='welcome',
+                        priority=DM_PRIORITY_BULK
                     )
-                except discord.Forbidden:
-                    print(f"[{ctx.guild.name}] Could not send DM to {member.name}")
-            else:
-                print(f"[{ctx.guild.name}] Skipped DM to {member.name} (ENABLE_BACKGROUND_CHECKS=False)")
+                else:
+                    member_logger.info("Skipped DM to %s (ENABLE_BACKGROUND_CHECKS=False)", member.name, extra=log_fields('dm_skipped', guild_id, member.id))
 
-    save_guild_pending(guild_id, pending_members)
+        untracked.clear()  # All tracked now (or no longer in the server)
+        if added_user_ids:
+            mark_guild_dirty(guild_id, 'pending', added_user_ids, reason='tracked')
 
-    # Build response message
-    response = f"Added {added_count} existing members to the tracking list. "
-    if ENABLE_BACKGROUND_CHECKS:
-        response += f"They have {grace_hours} hours to introduce themselves."
-    else:
-        response += f"⚠️ DMs NOT sent (ENABLE_BACKGROUND_CHECKS=False). They have {grace_hours} hours configured."
+        # Build response message
+        response = f"Added {added_count} existing members to the tracking list. "
+        if ENABLE_BACKGROUND_CHECKS:
+            response += f"They have {grace_hours} hours to introduce themselves. DMs are being sent in the background - use `!dmstatus` to follow progress."
+        else:
+            response += f"⚠️ DMs NOT sent (ENABLE_BACKGROUND_CHECKS=False). They have {grace_hours} hours configured."
 
-    await ctx.send(response)
+        await ctx.send(response)
 
 # Run the bot
 if __name__ == "__main__":
     TOKEN = os.getenv('DISCORD_BOT_TOKEN')
 
-    if not TOKEN:
+    if '--migrate-to-sqlite' in sys.argv:
+        migrate_json_to_sqlite()
+    elif not TOKEN:
         print("Error: DISCORD_BOT_TOKEN environment variable not set")
         print("Please set it with: export DISCORD_BOT_TOKEN='your_token_here'")
+    elif SHARD_ID is not None and not (SHARD_COUNT and 0 <= SHARD_ID < SHARD_COUNT):
+        print("Error: SHARD_ID must be between 0 and SHARD_COUNT - 1 (set SHARD_COUNT too)")
     else:
-        print("Starting Allo Bot with multi-server support...")
-        print("Use !setintrochannel in each server to configure the bot.")
-        bot.run(TOKEN)
+        setup_logging()
+        bot_logger.info("Starting Allo Bot with multi-server support...")
+        bot_logger.info("Use !setintrochannel in each server to configure the bot.")
+        try:
+            bot.run(TOKEN, log_handler=None)  # discord.py logs go through our handler too
+        finally:
+            stop_logging()